@@ -0,0 +1,98 @@
+import random
+from array import array
+from Encoding import Encoding
+from Propagator import Propagator
+from ClauseEvaluator import ClauseEvaluator
+from Instrumentation import Instrumentation
+from Sudoku import Sudoku
+
+
+def prepare_search(solver, sudoku, propagator):
+    """
+    Hand the options of a solver (BatchSolver or CnfSolver) to a Sudoku
+    about to be searched on the given propagator: stats output,
+    cancellation, restarts, a seed per puzzle, the budget, which starts
+    now, and instrumentation.
+    """
+    sudoku.persist = solver.persist
+    sudoku.stats_format = solver.stats_format
+    sudoku.cancel = solver.cancel
+    if solver.restart_policy is not None:
+        solver.restart_policy.reset()
+        sudoku.restart_policy = solver.restart_policy
+    if solver.seed is not None:
+        # Seeded per puzzle, so a puzzle gets the same choices whichever process solves it
+        sudoku.rng = random.Random(f"{solver.seed}:{sudoku.id}")
+    if solver.budget is not None:
+        solver.budget.start()
+        sudoku.budget = solver.budget
+    if solver.instrumentation is not None:
+        solver.instrumentation.reset()
+        solver.instrumentation.attach(sudoku, propagator)
+
+
+def finish_search(solver, sudoku):
+    """
+    Keep the time per phase of an instrumented search and remove the
+    instrumentation again.
+    """
+    if solver.instrumentation is not None:
+        sudoku.phases = solver.instrumentation.record()
+        solver.instrumentation.detach()
+
+
+class BatchSolver:
+    """
+    Solves a sequence of puzzles against one ClauseDatabase. The watches on
+    the rules are built once; each puzzle only asserts its givens as
+    assumptions and is backtracked away afterwards, so adding a puzzle
+    costs O(givens) instead of O(rules).
+    """
+    def __init__(self, database, grid_size, filename=None, heuristic_id=None, persist=True, backend=None, restart_policy=None, seed=None, budget=None, instrument=False, stats_format=None) -> None:
+        self.database = database
+        self.persist = persist
+        self.grid_size = grid_size
+        self.filename = filename if filename is not None else ""
+        self.heuristic_id = heuristic_id if heuristic_id is not None else -1
+        self.encoding = Encoding(grid_size)
+        self.propagator = Propagator(database.clauses, database.n_vars)
+        self.evaluator = ClauseEvaluator(database.clauses, database.n_vars, backend)
+        self.mom_counter = None
+        self.cancel = None
+        self.restart_policy = restart_policy
+        self.seed = seed
+        self.budget = budget
+        self.instrumentation = Instrumentation() if instrument else None
+        self.stats_format = stats_format if stats_format is not None else "lines"
+
+    def solve(self, constraints, id=None, strategy=None):
+        """
+        Solve one puzzle given as unit clauses. Returns the Sudoku holding
+        the statistics and a snapshot of the final assignment.
+        """
+        strategy = strategy if strategy is not None else self.heuristic_id
+        sudoku = Sudoku(
+            id=id,
+            rules=self.database.clauses,
+            constraints=constraints,
+            grid_size=self.grid_size,
+            n_vars=self.database.n_vars,
+            filename=self.filename,
+            heuristic_id=strategy,
+            encoding=self.encoding
+        )
+        sudoku.mom_counter = self.mom_counter
+        sudoku.evaluator = self.evaluator
+        prepare_search(self, sudoku, self.propagator)
+        sudoku.init_assumptions(self.propagator)
+
+        if sudoku.satisfiable:
+            sudoku.solve(strategy)
+        finish_search(self, sudoku)
+
+        # Keep the result, then hand the propagator back clean
+        sudoku.assignments = array('b', self.propagator.assignments)
+        sudoku.backtrack(0)
+        self.propagator.forget_learned(len(self.database))
+        self.mom_counter = sudoku.mom_counter
+        return sudoku
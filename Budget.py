@@ -0,0 +1,31 @@
+import time
+
+
+class Budget:
+    """
+    Per-puzzle limits on the work a search may do: wall-clock seconds,
+    decisions and conflicts. A limit left at None is not enforced. The
+    clock starts when a solver begins a puzzle; a search that runs out
+    stops at its next check and reports the puzzle as UNKNOWN.
+    """
+    def __init__(self, time_limit=None, decision_limit=None, conflict_limit=None) -> None:
+        self.time_limit = time_limit
+        self.decision_limit = decision_limit
+        self.conflict_limit = conflict_limit
+        self.start_time = time.time()
+
+    def start(self):
+        self.start_time = time.time()
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def exhausted(self, n_decisions, n_conflicts):
+        """
+        True once any of the limits has been reached.
+        """
+        if self.decision_limit is not None and n_decisions >= self.decision_limit:
+            return True
+        if self.conflict_limit is not None and n_conflicts >= self.conflict_limit:
+            return True
+        return self.time_limit is not None and self.elapsed() >= self.time_limit
@@ -0,0 +1,150 @@
+import os
+import sys
+import struct
+import hashlib
+from array import array
+from CnfPreprocessor import CnfPreprocessor
+
+
+# magic, key, n_clauses, n_literals, n_vars, source mtime_ns, source size, source sha256
+CACHE_HEADER = struct.Struct("=4siqqqqq32s")
+CACHE_MAGIC = b"CDB2" if sys.byteorder == "little" else b"2BDC"
+
+
+class ClauseDatabase:
+    """
+    Immutable clause store for a rules file. The rules are compiled once
+    by the CnfPreprocessor passes, removing tautologies, duplicate literals
+    and clauses, and subsumed clauses, and shared by every puzzle solved
+    against them. Pure literals are left alone, the givens are only
+    assumed later. Clauses that are already clean, such as the generated
+    rules, are taken as they are with compiled=True.
+    """
+    def __init__(self, clauses, n_vars=None, compiled=False) -> None:
+        self.preprocessing_report = None
+        if compiled:
+            self.clauses = tuple(clauses)
+        else:
+            preprocessor = CnfPreprocessor(clauses)
+            self.clauses = tuple(tuple(clause) for clause in preprocessor.run(pure_literals=False))
+            self.preprocessing_report = preprocessor.report()
+
+        self.n_vars = n_vars if n_vars is not None else max((abs(literal) for clause in self.clauses for literal in clause), default=0)
+
+    def __len__(self):
+        return len(self.clauses)
+
+
+    def to_flat(self):
+        """
+        Return the clauses as an offsets array and a flat literal array;
+        clause i is literals[offsets[i]:offsets[i + 1]].
+        """
+        offsets = array('i', [0])
+        literals = array('i')
+        for clause in self.clauses:
+            literals.extend(clause)
+            offsets.append(len(literals))
+        return offsets, literals
+
+
+def source_digest(source_path):
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def write_cache(cache_path, database, key, source_stat, digest):
+    offsets, literals = database.to_flat()
+    header = CACHE_HEADER.pack(CACHE_MAGIC, key, len(database), len(literals), database.n_vars,
+                               source_stat.st_mtime_ns, source_stat.st_size, digest)
+
+    # Write next to the final file and swap it in, so concurrent readers never see half a cache
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(header)
+        offsets.tofile(f)
+        literals.tofile(f)
+    os.replace(temporary_path, cache_path)
+
+
+def decode_body(body, n_clauses, n_literals):
+    """
+    Split the body of a cache into clauses. Raises ValueError if it does not
+    hold the counts the header announces.
+    """
+    offsets = array('i')
+    literals = array('i')
+    size = offsets.itemsize
+    if n_clauses < 0 or n_literals < 0 or len(body) != (n_clauses + 1 + n_literals) * size:
+        raise ValueError("Truncated clause cache")
+    offsets.frombytes(body[:(n_clauses + 1) * size])
+    literals.frombytes(body[(n_clauses + 1) * size:])
+
+    flat = literals.tolist()
+    bounds = offsets.tolist()
+    if bounds[0] != 0 or bounds[-1] != n_literals or any(start > end for start, end in zip(bounds, bounds[1:])):
+        raise ValueError("Corrupt clause offsets")
+    return [tuple(flat[bounds[index]:bounds[index + 1]]) for index in range(n_clauses)]
+
+
+def read_cache(cache_path, key, source_path, source_stat):
+    """
+    Read a cached clause database. Returns None if there is no cache, it
+    was built from a different source or key, or its body is damaged.
+    """
+    try:
+        f = open(cache_path, 'rb')
+    except OSError:
+        return None
+
+    with f:
+        header = f.read(CACHE_HEADER.size)
+        if len(header) < CACHE_HEADER.size:
+            return None
+        magic, cached_key, n_clauses, n_literals, n_vars, mtime_ns, size, digest = CACHE_HEADER.unpack(header)
+        if magic != CACHE_MAGIC or cached_key != key or size != source_stat.st_size:
+            return None
+
+        # Only touched, not changed: check the content before trusting the cache
+        if mtime_ns != source_stat.st_mtime_ns:
+            if digest != source_digest(source_path):
+                return None
+            try:
+                with open(cache_path, 'r+b') as header_file:
+                    header_file.write(CACHE_HEADER.pack(magic, key, n_clauses, n_literals, n_vars, source_stat.st_mtime_ns, size, digest))
+            except OSError:
+                pass
+
+        body = f.read()
+
+    try:
+        clauses = decode_body(body, n_clauses, n_literals)
+    except ValueError:
+        # Truncated or corrupt body, rebuilt like a stale header
+        return None
+    return ClauseDatabase(clauses, n_vars=n_vars, compiled=True)
+
+
+def load_cached_database(source_path, build, key=0):
+    """
+    Load the clause database compiled from a source file, using the binary
+    cache next to it (same name, .cdb extension). The cache is rebuilt with
+    build() when the source's mtime and content no longer match it.
+    """
+    cache_path = os.path.splitext(source_path)[0] + ".cdb"
+    source_stat = os.stat(source_path)
+
+    database = read_cache(cache_path, key, source_path, source_stat)
+    if database is not None:
+        return database
+
+    database = build()
+    try:
+        write_cache(cache_path, database, key, source_stat, source_digest(source_path))
+    except OSError:
+        # Read-only checkout, solve without a cache
+        pass
+    return database
@@ -0,0 +1,87 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+BACKENDS = ("python", "numpy")
+
+
+class ClauseEvaluator:
+    """
+    Whole-formula checks against an assignment array ('b', 1 true, -1 false,
+    0 unassigned).
+
+    Both backends remember the last clause found open and look at it
+    first. During the search that clause is usually still open, so most
+    checks stop after one clause. From there the python backend scans on
+    clause by clause, while the numpy backend evaluates every clause in
+    one vectorized pass over the clauses in CSR form, a flat literal array
+    plus clause offsets: the assignment is viewed without copying, each
+    literal's value is its variable's value times its sign, and a clause
+    is satisfied when the maximum over its literals is positive.
+    """
+    def __init__(self, clauses, n_vars=None, backend=None) -> None:
+        self.backend = backend if backend is not None else "python"
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown clause evaluation backend: {self.backend}")
+        if self.backend == "numpy" and np is None:
+            raise ImportError("The numpy backend needs NumPy installed")
+
+        self.clauses = [tuple(clause) for clause in clauses]
+        self.n_vars = n_vars if n_vars is not None else max((abs(literal) for clause in self.clauses for literal in clause), default=0)
+        self.has_empty_clause = any(not clause for clause in self.clauses)
+        self.hint = 0
+
+        if self.backend == "numpy":
+            sizes = np.fromiter((len(clause) for clause in self.clauses), dtype=np.intp, count=len(self.clauses))
+            literals = np.fromiter((literal for clause in self.clauses for literal in clause), dtype=np.int32, count=int(sizes.sum()))
+            offsets = np.zeros(len(self.clauses) + 1, dtype=np.intp)
+            np.cumsum(sizes, out=offsets[1:])
+
+            self.literals = literals
+            self.offsets = offsets
+            self.variables = np.abs(literals).astype(np.intp)
+            self.signs = np.sign(literals).astype(np.int8)
+            # reduceat needs non-empty segments, empty clauses are tracked separately
+            self.clause_indices = np.flatnonzero(sizes)
+            self.starts = offsets[:-1][self.clause_indices]
+
+
+    def clause_maxima(self, assignments):
+        values = np.frombuffer(assignments, dtype=np.int8)[self.variables] * self.signs
+        return np.maximum.reduceat(values, self.starts)
+
+
+    def satisfied(self, assignments):
+        """
+        True if every clause has a true literal.
+        """
+        if self.has_empty_clause:
+            return False
+        if not self.clauses:
+            return True
+
+        clauses = self.clauses
+        if self.backend == "numpy":
+            for literal in clauses[self.hint]:
+                if assignments[abs(literal)] * literal > 0:
+                    break
+            else:
+                return False
+            open_clauses = np.flatnonzero(self.clause_maxima(assignments) <= 0)
+            if open_clauses.size:
+                self.hint = int(self.clause_indices[open_clauses[0]])
+                return False
+            return True
+
+        n_clauses = len(clauses)
+        for step in range(n_clauses):
+            index = (self.hint + step) % n_clauses
+            for literal in clauses[index]:
+                if assignments[abs(literal)] * literal > 0:
+                    break
+            else:
+                self.hint = index
+                return False
+        return True
@@ -0,0 +1,181 @@
+class CnfPreprocessor:
+    """
+    Simplifies a CNF before the search while keeping its models: tautologies,
+    duplicate clauses, pure literals, subsumed clauses, and literals removed
+    by self-subsuming resolution. Clauses are kept with occurrence lists so
+    every pass only looks at clauses sharing a literal. Each pass records
+    how many clauses and literals it removed.
+    """
+    PASSES = ("tautologies", "duplicates", "pure literals", "subsumption", "self-subsumption")
+
+    def __init__(self, clauses) -> None:
+        self.clauses = [list(clause) for clause in clauses]
+        self.literal_sets = [set(clause) for clause in self.clauses]
+        self.occurrences = {}
+        self.pure_literals = []
+        self.removed = {name: [0, 0] for name in self.PASSES}
+        self.n_input_clauses = len(self.clauses)
+        self.n_input_literals = sum(len(clause) for clause in self.clauses)
+
+        for index, clause in enumerate(self.clauses):
+            for literal in self.literal_sets[index]:
+                self.occurrences.setdefault(literal, set()).add(index)
+
+
+    def remove_clause(self, index, name):
+        for literal in self.literal_sets[index]:
+            self.occurrences[literal].discard(index)
+        self.removed[name][0] += 1
+        self.removed[name][1] += len(self.clauses[index])
+        self.clauses[index] = None
+        self.literal_sets[index] = None
+
+    def remove_literal(self, index, literal, name):
+        self.clauses[index].remove(literal)
+        self.literal_sets[index].discard(literal)
+        self.occurrences[literal].discard(index)
+        self.removed[name][1] += 1
+
+    def live(self):
+        return [index for index, clause in enumerate(self.clauses) if clause is not None]
+
+
+    def remove_tautologies(self):
+        for index in self.live():
+            literal_set = self.literal_sets[index]
+            if any(-literal in literal_set for literal in literal_set):
+                self.remove_clause(index, "tautologies")
+
+    def remove_duplicates(self):
+        """
+        Remove repeated literals within a clause and repeated clauses.
+        """
+        seen = set()
+        for index in self.live():
+            clause = self.clauses[index]
+            if len(clause) != len(self.literal_sets[index]):
+                self.removed["duplicates"][1] += len(clause) - len(self.literal_sets[index])
+                self.clauses[index] = list(dict.fromkeys(clause))
+
+            key = frozenset(self.literal_sets[index])
+            if key in seen:
+                self.remove_clause(index, "duplicates")
+            else:
+                seen.add(key)
+
+    def eliminate_pure_literals(self):
+        """
+        A literal whose negation occurs nowhere can be made true, which
+        satisfies every clause containing it. Removing those clauses can
+        make further literals pure. Literals that are already unit clauses
+        are left to subsumption.
+        """
+        units = {self.clauses[index][0] for index in self.live() if len(self.clauses[index]) == 1}
+        candidates = list(self.occurrences)
+        while candidates:
+            next_candidates = set()
+            for literal in candidates:
+                if literal in units:
+                    continue
+                if self.occurrences.get(literal) and not self.occurrences.get(-literal):
+                    self.pure_literals.append(literal)
+                    for index in list(self.occurrences[literal]):
+                        next_candidates.update(-other for other in self.literal_sets[index] if other != literal)
+                        self.remove_clause(index, "pure literals")
+            candidates = next_candidates
+
+    def subsumed_by(self, index):
+        """
+        Return the other clauses containing every literal of the clause: the
+        intersection of its literals' occurrence lists, smallest first.
+        """
+        occurrences = sorted((self.occurrences[literal] for literal in self.literal_sets[index]), key=len)
+        return [other for other in occurrences[0].intersection(*occurrences[1:]) if other != index]
+
+    def subsume(self, indices):
+        """
+        Backward subsumption from the given clauses, smallest first.
+        """
+        for index in sorted(indices, key=lambda index: len(self.clauses[index]) if self.clauses[index] is not None else 0):
+            if self.clauses[index] is None or not self.clauses[index]:
+                continue
+            for other in self.subsumed_by(index):
+                self.remove_clause(other, "subsumption")
+
+    def self_subsume(self, indices):
+        """
+        Self-subsuming resolution: if C contains l and D contains -l and the
+        rest of C, resolving them gives D without -l, which replaces D.
+        Returns the strengthened clauses.
+        """
+        strengthened = set()
+        queue = list(indices)
+        while queue:
+            index = queue.pop()
+            literal_set = self.literal_sets[index]
+            if literal_set is None or not literal_set:
+                continue
+            for literal in list(literal_set):
+                if literal not in literal_set:
+                    continue
+                # The clauses holding -literal and the rest of the clause
+                occurrences = [self.occurrences.get(-literal, set())] + [self.occurrences[other] for other in literal_set if other != literal]
+                occurrences.sort(key=len)
+                for other in occurrences[0].intersection(*occurrences[1:]):
+                    self.remove_literal(other, -literal, "self-subsumption")
+                    strengthened.add(other)
+                    queue.append(other)
+        return strengthened
+
+
+    def run(self, pure_literals=True):
+        """
+        Run every pass and return the simplified clauses. Pure literals are
+        kept as unit clauses so they are still assigned in the model. Pass
+        pure_literals=False for clauses that more are added to later, such
+        as rules solved under assumptions: a literal pure in the rules need
+        not be pure once the assumptions are in.
+        """
+        self.remove_tautologies()
+        self.remove_duplicates()
+        if pure_literals:
+            self.eliminate_pure_literals()
+
+        self.subsume(self.live())
+        changed = self.self_subsume(self.live())
+        while changed:
+            # Strengthened clauses may subsume or strengthen others in turn
+            self.subsume(changed)
+            changed = self.self_subsume(index for index in changed if self.clauses[index] is not None)
+
+        return [clause for clause in self.clauses if clause is not None] + [[literal] for literal in self.pure_literals]
+
+
+    def left(self):
+        n_clauses = sum(1 for clause in self.clauses if clause is not None) + len(self.pure_literals)
+        n_literals = sum(len(clause) for clause in self.clauses if clause is not None) + len(self.pure_literals)
+        return n_clauses, n_literals
+
+    def summary(self):
+        """
+        The counts of report() as a dict, for the stats record.
+        """
+        n_clauses, n_literals = self.left()
+        summary = {"input": {"clauses": self.n_input_clauses, "literals": self.n_input_literals}}
+        for name in self.PASSES:
+            clauses, literals = self.removed[name]
+            summary[name] = {"clauses": clauses, "literals": literals}
+        summary["pure literals fixed"] = len(self.pure_literals)
+        summary["left"] = {"clauses": n_clauses, "literals": n_literals}
+        return summary
+
+    def report(self):
+        lines = [f"CNF preprocessing: {self.n_input_clauses} clauses, {self.n_input_literals} literals"]
+        for name in self.PASSES:
+            clauses, literals = self.removed[name]
+            lines.append(f"  {name}: removed {clauses} clauses, {literals} literals")
+        if self.pure_literals:
+            lines.append(f"  pure literals fixed: {len(self.pure_literals)}")
+        n_clauses, n_literals = self.left()
+        lines.append(f"  left: {n_clauses} clauses, {n_literals} literals")
+        return "\n".join(lines)
@@ -0,0 +1,59 @@
+from Instrumentation import Instrumentation
+from Sudoku import Sudoku, STRATEGIES
+from BatchSolver import prepare_search, finish_search
+
+
+class CnfSolver:
+    """
+    Solves plain CNF formulas, such as DIMACS files, with the SAT engines
+    (strategies 1-4). Nothing is Sudoku specific: there is no grid or
+    encoding, and the model keeps the formula's own variable numbers.
+    Unlike BatchSolver nothing is shared between formulas, each one is
+    simplified and watched on its own.
+    """
+    def __init__(self, filename=None, heuristic_id=None, persist=True, backend=None, restart_policy=None, seed=None, budget=None, instrument=False, stats_format=None) -> None:
+        self.persist = persist
+        self.filename = filename if filename is not None else ""
+        self.heuristic_id = heuristic_id if heuristic_id is not None else -1
+        self.backend = backend
+        self.cancel = None
+        self.restart_policy = restart_policy
+        self.seed = seed
+        self.budget = budget
+        self.instrumentation = Instrumentation() if instrument else None
+        self.stats_format = stats_format if stats_format is not None else "lines"
+
+    def solve(self, clauses, n_vars, id=None, strategy=None):
+        """
+        Solve one formula. Returns the Sudoku holding the statistics and
+        the assignment, whose model() is the answer if it is satisfiable.
+        """
+        strategy = strategy if strategy is not None else self.heuristic_id
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Strategy {strategy} cannot solve a plain CNF")
+        sudoku = Sudoku(
+            id=id,
+            rules=clauses,
+            clauses=clauses,
+            n_vars=n_vars,
+            filename=self.filename,
+            heuristic_id=strategy
+        )
+        sudoku.init_simplification(self.backend)
+        prepare_search(self, sudoku, sudoku.propagator)
+
+        if sudoku.satisfiable:
+            sudoku.solve(strategy)
+        else:
+            # Refuted by the simplification alone, no engine ran to save the stats
+            sudoku.save_performence_stats()
+        finish_search(self, sudoku)
+        return sudoku
+
+
+def satisfies(model, clauses):
+    """
+    True if the model, one literal per variable, satisfies every clause.
+    """
+    true_literals = set(model)
+    return all(any(literal in true_literals for literal in clause) for clause in clauses)
@@ -0,0 +1,62 @@
+import random
+from PuzzleReader import open_puzzle_file
+
+
+def read_dimacs(path):
+    """
+    Read a DIMACS CNF file, optionally gzip-compressed. Returns (n_vars,
+    clauses). A clause ends at its 0 wherever that is, so clauses may span
+    lines or share one. Comments are skipped and reading stops at the "%"
+    end marker of the SATLIB benchmark files.
+    """
+    n_vars = None
+    clauses = []
+    clause = []
+
+    with open_puzzle_file(path) as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('c'):
+                continue
+            if fields[0] == '%':
+                break
+            if fields[0] == 'p':
+                if len(fields) != 4 or fields[1] != 'cnf':
+                    raise ValueError(f"{path}:{line_number}: expected 'p cnf <variables> <clauses>'")
+                n_vars = int(fields[2])
+                continue
+
+            for field in fields:
+                try:
+                    literal = int(field)
+                except ValueError:
+                    raise ValueError(f"{path}:{line_number}: invalid literal {field!r}") from None
+                if literal:
+                    clause.append(literal)
+                else:
+                    clauses.append(clause)
+                    clause = []
+
+    # A last clause without its 0
+    if clause:
+        clauses.append(clause)
+
+    max_variable = max((abs(literal) for clause in clauses for literal in clause), default=0)
+    if n_vars is None:
+        n_vars = max_variable
+    elif max_variable > n_vars:
+        raise ValueError(f"{path}: variable {max_variable} exceeds the {n_vars} declared")
+    return n_vars, clauses
+
+
+def random_ksat(n_vars, n_clauses, k=3, rng=None):
+    """
+    Uniform random k-SAT: every clause has k distinct variables drawn
+    uniformly, each negated with probability 1/2. At n_clauses = 4.26 *
+    n_vars random 3-SAT is at its phase transition, about half the
+    instances are satisfiable and they are the hardest to decide.
+    """
+    rng = rng if rng is not None else random.Random()
+    variables = range(1, n_vars + 1)
+    return [[variable if rng.random() < 0.5 else -variable for variable in rng.sample(variables, k)]
+            for _ in range(n_clauses)]
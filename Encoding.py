@@ -0,0 +1,120 @@
+class Encoding:
+    """
+    Dense variable numbering for a Sudoku grid of any size.
+
+    Cell (row, col) holding value is variable (row * n + col) * n + value,
+    with row and col counted from 0 and value from 1, so the variables of an
+    n x n grid are exactly 1..n^3. The rules files and solution outputs name
+    the same variable row * base^2 + col * base + value with row and col
+    counted from 1, where base is 10 for grids up to 9x9 and n + 1 above;
+    external() and dense() translate between the two.
+    """
+    def __init__(self, grid_size) -> None:
+        self.grid_size = grid_size
+        self.box_size = int(round(grid_size ** 0.5))
+        self.n_vars = grid_size * grid_size * grid_size
+        self.base = 10 if grid_size < 10 else grid_size + 1
+
+
+    def variable(self, row, col, value):
+        return (row * self.grid_size + col) * self.grid_size + value
+
+    def decode(self, variable):
+        """
+        Return (row, col, value) of a variable, row and col counted from 0.
+        """
+        cell, value = divmod(variable - 1, self.grid_size)
+        row, col = divmod(cell, self.grid_size)
+        return row, col, value + 1
+
+
+    def value(self, char):
+        """
+        Value of a puzzle character: digits, then A, B, ... for 10, 11, ...
+        Returns 0 for an empty cell. Raises ValueError for a character
+        that is not a value of this grid size, rather than letting it name
+        a variable of the next cell.
+        """
+        if char == '.':
+            return 0
+        value = int(char, 36)
+        if value > self.grid_size:
+            raise ValueError(f"Value {char!r} out of range for a {self.grid_size}x{self.grid_size} grid")
+        return value
+
+    def char(self, value):
+        """
+        Puzzle character of a value, the inverse of value().
+        """
+        return "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"[value] if value else '.'
+
+
+    def givens(self, puzzle):
+        """
+        Unit clauses asserting the given values of a puzzle string.
+        """
+        n = self.grid_size
+        return [[self.variable(cell // n, cell % n, value)] for cell, value in enumerate(map(self.value, puzzle)) if value]
+
+
+    def external(self, literal):
+        row, col, value = self.decode(abs(literal))
+        name = (row + 1) * self.base * self.base + (col + 1) * self.base + value
+        return name if literal > 0 else -name
+
+    def dense(self, literal):
+        name = abs(literal)
+        row_col, value = divmod(name, self.base)
+        row, col = divmod(row_col, self.base)
+        variable = self.variable(row - 1, col - 1, value)
+        return variable if literal > 0 else -variable
+
+    def dense_clauses(self, clauses):
+        """
+        Translate clauses read from a rules file to dense variables.
+        """
+        return [[self.dense(literal) for literal in clause] for clause in clauses]
+
+
+    def rules(self):
+        """
+        Generate the Sudoku rules for this grid size. Every cell, row, column
+        and box holds each value at least once and at most once, the same
+        extended encoding as the files in rules/ without their duplicates:
+        two cells of a box in the same row or column are only kept apart by
+        the row or column clause.
+        """
+        grid_size = self.grid_size
+        box_size = self.box_size
+        variable = self.variable
+        clauses = []
+
+        def at_most_once(unit):
+            for i, first in enumerate(unit):
+                for second in unit[i + 1:]:
+                    clauses.append([-first, -second])
+
+        for row in range(grid_size):
+            for col in range(grid_size):
+                unit = [variable(row, col, value) for value in range(1, grid_size + 1)]
+                clauses.append(unit)
+                at_most_once(unit)
+
+        for value in range(1, grid_size + 1):
+            for row in range(grid_size):
+                unit = [variable(row, col, value) for col in range(grid_size)]
+                clauses.append(unit)
+                at_most_once(unit)
+            for col in range(grid_size):
+                unit = [variable(row, col, value) for row in range(grid_size)]
+                clauses.append(unit)
+                at_most_once(unit)
+            for box_row in range(0, grid_size, box_size):
+                for box_col in range(0, grid_size, box_size):
+                    cells = [(box_row + row, box_col + col) for row in range(box_size) for col in range(box_size)]
+                    clauses.append([variable(row, col, value) for row, col in cells])
+                    for i, (first_row, first_col) in enumerate(cells):
+                        for second_row, second_col in cells[i + 1:]:
+                            if first_row != second_row and first_col != second_col:
+                                clauses.append([-variable(first_row, first_col, value), -variable(second_row, second_col, value)])
+        return clauses
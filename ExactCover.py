@@ -0,0 +1,221 @@
+import time
+from array import array
+from Encoding import Encoding
+from Sudoku import Sudoku
+
+# Strategy number of the exact cover engine, after the SAT strategies 1-4
+EXACT_COVER = 5
+
+class ExactCoverSolver:
+    """
+    Solves Sudoku as an exact cover problem with Knuth's Algorithm X.
+
+    Every candidate (row, col, value), numbered like the SAT variables,
+    covers four constraints: its cell, and its value in its row, column and
+    box. A solution picks candidates covering every constraint exactly once.
+    Instead of the doubly linked lists of Dancing Links the matrix is kept
+    as a set of candidates per constraint; covering and uncovering a
+    candidate removes and restores it in the sets of every constraint it
+    conflicts with, the same reversible step DLX performs on its links.
+
+    The matrix is built once per grid size. Givens are covered before the
+    search and uncovered afterwards, so solving a puzzle leaves the matrix
+    as it was.
+    """
+    def __init__(self, grid_size, filename=None, heuristic_id=None, persist=True, budget=None, stats_format=None) -> None:
+        self.grid_size = grid_size
+        self.filename = filename if filename is not None else ""
+        self.heuristic_id = heuristic_id if heuristic_id is not None else -1
+        self.persist = persist
+        self.budget = budget
+        self.stats_format = stats_format if stats_format is not None else "lines"
+        self.encoding = Encoding(grid_size)
+
+        n = grid_size
+        box_size = self.encoding.box_size
+        self.rows = [None] * (self.encoding.n_vars + 1)
+        self.columns = {column: set() for column in range(4 * n * n)}
+        for row in range(n):
+            for col in range(n):
+                box = (row // box_size) * box_size + col // box_size
+                for value in range(1, n + 1):
+                    candidate = self.encoding.variable(row, col, value)
+                    constraints = (row * n + col,
+                                   n * n + row * n + value - 1,
+                                   2 * n * n + col * n + value - 1,
+                                   3 * n * n + box * n + value - 1)
+                    self.rows[candidate] = constraints
+                    for column in constraints:
+                        self.columns[column].add(candidate)
+
+        self.selected = []
+        self.dropped = []
+        self.cancel = None
+        self.cancelled = False
+        self.out_of_budget = False
+        self.n_splits = 0
+        self.n_backtracks = 0
+        self.n_conflicts = 0
+        self.n_forced = 0
+
+
+    def select(self, candidate):
+        """
+        Cover the constraints of a candidate and remove every candidate
+        conflicting with it. Returns what is needed to undo it.
+        """
+        columns = self.columns
+        rows = self.rows
+        covered = []
+        for column in rows[candidate]:
+            for other in columns[column]:
+                for other_column in rows[other]:
+                    if other_column != column:
+                        columns[other_column].discard(other)
+            covered.append(columns.pop(column))
+        return covered
+
+    def deselect(self, candidate, covered):
+        columns = self.columns
+        rows = self.rows
+        for column in reversed(rows[candidate]):
+            columns[column] = covered.pop()
+            for other in columns[column]:
+                for other_column in rows[other]:
+                    if other_column != column:
+                        columns[other_column].add(other)
+
+
+    def search(self, solution):
+        """
+        Extend the partial solution until every constraint is covered. The
+        matrix is restored on the way back up whether or not a solution was
+        found; on success the chosen candidates stay in the solution.
+        """
+        columns = self.columns
+        if not columns:
+            return True
+        if self.cancel is not None and (self.cancelled or self.cancel.is_set()):
+            self.cancelled = True
+            return False
+        if self.budget is not None and (self.out_of_budget or self.budget.exhausted(self.n_splits, self.n_conflicts)):
+            self.out_of_budget = True
+            return False
+
+        # Constraint with the fewest candidates left
+        candidates = min(columns.values(), key=len)
+        if not candidates:
+            self.n_conflicts += 1
+            return False
+
+        forced = len(candidates) == 1
+        for candidate in sorted(candidates):
+            if forced:
+                self.n_forced += 1
+            else:
+                self.n_splits += 1
+            covered = self.select(candidate)
+            solution.append(candidate)
+
+            solved = self.search(solution)
+            self.deselect(candidate, covered)
+            if solved:
+                return True
+
+            solution.pop()
+            if self.cancelled or self.out_of_budget:
+                return False
+            if not forced:
+                self.n_backtracks += 1
+        return False
+
+
+    def assume(self, constraints):
+        """
+        Cover the givens and drop the candidates ruled out by negative unit
+        clauses. Returns False if the givens contradict each other.
+        """
+        self.selected = []
+        self.dropped = []
+
+        for clause in constraints:
+            candidate = clause[0]
+            if candidate < 0:
+                continue
+            if any(column not in self.columns or candidate not in self.columns[column] for column in self.rows[candidate]):
+                return False
+            self.selected.append((candidate, self.select(candidate)))
+
+        givens = {candidate for candidate, _ in self.selected}
+        for clause in constraints:
+            candidate = -clause[0]
+            if candidate < 0:
+                continue
+            if candidate in givens:
+                return False
+            removed = [column for column in self.rows[candidate] if column in self.columns and candidate in self.columns[column]]
+            for column in removed:
+                self.columns[column].discard(candidate)
+            self.dropped.append((candidate, removed))
+        return True
+
+    def retract(self):
+        """
+        Undo assume() in reverse order.
+        """
+        while self.dropped:
+            candidate, removed = self.dropped.pop()
+            for column in removed:
+                self.columns[column].add(candidate)
+        while self.selected:
+            self.deselect(*self.selected.pop())
+
+
+    def solve(self, constraints, id=None, strategy=None):
+        """
+        Solve one puzzle given as unit clauses. Returns a Sudoku holding the
+        statistics and the solution, like BatchSolver.
+        """
+        sudoku = Sudoku(
+            id=id,
+            grid_size=self.grid_size,
+            n_vars=self.encoding.n_vars,
+            filename=self.filename,
+            heuristic_id=strategy if strategy is not None else self.heuristic_id,
+            encoding=self.encoding
+        )
+        sudoku.persist = self.persist
+        sudoku.stats_format = self.stats_format
+        self.n_splits = self.n_backtracks = self.n_conflicts = self.n_forced = 0
+        self.cancelled = self.out_of_budget = False
+        if self.budget is not None:
+            self.budget.start()
+        start_time = time.time()
+
+        solution = []
+        if self.assume(constraints) and self.search(solution):
+            print("Solution found!")
+            sudoku.assignments = array('b', [-1]) * (self.encoding.n_vars + 1)
+            sudoku.assignments[0] = 0
+            for candidate, _ in self.selected:
+                sudoku.assignments[candidate] = 1
+            for candidate in solution:
+                sudoku.assignments[candidate] = 1
+        else:
+            sudoku.satisfiable = False
+
+        # Hand the matrix back untouched for the next puzzle
+        self.retract()
+
+        sudoku.runtime = time.time() - start_time
+        sudoku.n_splits = self.n_splits
+        sudoku.n_backtracks = self.n_backtracks
+        sudoku.n_conflicts = self.n_conflicts
+        sudoku.n_unit_propagations = self.n_forced
+        sudoku.cancelled = self.cancelled
+        sudoku.out_of_budget = self.out_of_budget
+
+        sudoku.save_performence_stats()
+        if sudoku.satisfiable:
+            sudoku.output_solution()
+        return sudoku
@@ -0,0 +1,206 @@
+from Encoding import Encoding
+
+
+class GridPreprocessor:
+    """
+    Solves as much of a puzzle as possible on the grid itself before any SAT
+    search. Every cell keeps a bitmask of its candidate values (bit v - 1
+    for value v) and the classic deductions are applied until nothing
+    changes: placing a value removes it from the cell's peers, naked
+    singles (one candidate left in a cell), hidden singles (a value fits
+    only one cell of a row, column or box) and locked candidates (a value
+    confined to the intersection of a box and a line is removed from the
+    rest of the other one).
+    """
+    def __init__(self, grid_size, encoding=None) -> None:
+        self.grid_size = grid_size
+        self.encoding = encoding if encoding is not None else Encoding(grid_size)
+        self.full = (1 << grid_size) - 1
+
+        n = grid_size
+        box_size = self.encoding.box_size
+        rows = [[row * n + col for col in range(n)] for row in range(n)]
+        cols = [[row * n + col for row in range(n)] for col in range(n)]
+        boxes = [[(box_row + row) * n + box_col + col for row in range(box_size) for col in range(box_size)]
+                 for box_row in range(0, n, box_size) for box_col in range(0, n, box_size)]
+        self.units = rows + cols + boxes
+
+        peers = [set() for _ in range(n * n)]
+        for unit in self.units:
+            for cell in unit:
+                peers[cell].update(unit)
+        self.peers = [tuple(sorted(cell_peers - {cell})) for cell, cell_peers in enumerate(peers)]
+
+        # Every box crossed with every row and column through it:
+        # (intersection, rest of the box, rest of the line)
+        self.intersections = []
+        for box in boxes:
+            box_cells = set(box)
+            lines = {cell // n for cell in box}, {cell % n for cell in box}
+            for line in [rows[row] for row in sorted(lines[0])] + [cols[col] for col in sorted(lines[1])]:
+                segment = [cell for cell in line if cell in box_cells]
+                box_rest = [cell for cell in box if cell not in segment]
+                line_rest = [cell for cell in line if cell not in box_cells]
+                self.intersections.append((segment, box_rest, line_rest))
+
+        self.candidates = []
+        self.solved = []
+        self.pending = []
+        self.contradiction = False
+        self.n_naked_singles = 0
+        self.n_hidden_singles = 0
+        self.n_locked_candidates = 0
+
+
+    def load(self, puzzle):
+        n = self.grid_size
+        self.candidates = [self.full] * (n * n)
+        self.solved = [False] * (n * n)
+        self.pending = []
+        self.contradiction = False
+        self.n_naked_singles = 0
+        self.n_hidden_singles = 0
+        self.n_locked_candidates = 0
+
+        for cell in range(n * n):
+            value = self.encoding.value(puzzle[cell])
+            if value and not self.place(cell, value):
+                break
+
+
+    def place(self, cell, value):
+        bit = 1 << (value - 1)
+        if not self.candidates[cell] & bit:
+            # Leave the cell without candidates so the constraints stay unsatisfiable
+            self.candidates[cell] = 0
+            self.contradiction = True
+            return False
+
+        self.candidates[cell] = bit
+        self.solved[cell] = True
+        for peer in self.peers[cell]:
+            if self.candidates[peer] & bit:
+                self.eliminate(peer, bit)
+        return not self.contradiction
+
+    def eliminate(self, cell, bits):
+        """
+        Remove candidate values from a cell. Returns True if any was removed.
+        """
+        candidates = self.candidates[cell]
+        if not candidates & bits:
+            return False
+
+        candidates &= ~bits
+        self.candidates[cell] = candidates
+        if not candidates:
+            self.contradiction = True
+        elif not candidates & (candidates - 1) and not self.solved[cell]:
+            # Naked single, placed once the current deduction is done
+            self.pending.append(cell)
+        return True
+
+
+    def naked_singles(self):
+        while self.pending and not self.contradiction:
+            cell = self.pending.pop()
+            if not self.solved[cell]:
+                self.n_naked_singles += 1
+                self.place(cell, self.candidates[cell].bit_length())
+
+    def hidden_singles(self):
+        changed = False
+        candidates = self.candidates
+        for unit in self.units:
+            once = twice = 0
+            for cell in unit:
+                mask = candidates[cell]
+                twice |= once & mask
+                once |= mask
+
+            if once != self.full:
+                # Some value fits nowhere in this unit
+                self.contradiction = True
+                return False
+
+            singles = once & ~twice
+            for cell in unit:
+                if singles & candidates[cell] and not self.solved[cell]:
+                    self.n_hidden_singles += 1
+                    changed = True
+                    if not self.place(cell, (singles & candidates[cell]).bit_length()):
+                        return False
+        return changed
+
+    def locked_candidates(self):
+        changed = False
+        candidates = self.candidates
+        for segment, box_rest, line_rest in self.intersections:
+            inside = 0
+            for cell in segment:
+                if not self.solved[cell]:
+                    inside |= candidates[cell]
+            if not inside:
+                continue
+            in_box_rest = 0
+            for cell in box_rest:
+                in_box_rest |= candidates[cell]
+            in_line_rest = 0
+            for cell in line_rest:
+                in_line_rest |= candidates[cell]
+
+            # Pointing: confined to the segment within the box, so not elsewhere on the line
+            pointing = inside & ~in_box_rest & in_line_rest
+            # Claiming: confined to the segment within the line, so not elsewhere in the box
+            claiming = inside & ~in_line_rest & in_box_rest
+            for bits, cells in ((pointing, line_rest), (claiming, box_rest)):
+                if bits:
+                    for cell in cells:
+                        if self.eliminate(cell, bits):
+                            self.n_locked_candidates += 1
+                            changed = True
+            if self.contradiction:
+                return False
+        return changed
+
+
+    def simplify(self):
+        """
+        Apply the deductions until a fixpoint or a contradiction. The cheap
+        ones are exhausted before the more expensive ones are tried again.
+        """
+        while not self.contradiction:
+            self.naked_singles()
+            if self.contradiction or self.hidden_singles() or self.pending:
+                continue
+            if self.contradiction or self.locked_candidates():
+                continue
+            break
+        return not self.contradiction
+
+
+    def constraints(self):
+        """
+        Return every variable decided on the grid as a unit clause: the
+        placed values true and the eliminated candidates false.
+        """
+        n = self.grid_size
+        variable = self.encoding.variable
+        constraints = []
+        for cell, candidates in enumerate(self.candidates):
+            row, col = divmod(cell, n)
+            for value in range(1, n + 1):
+                if not candidates & (1 << (value - 1)):
+                    constraints.append([-variable(row, col, value)])
+                elif self.solved[cell]:
+                    constraints.append([variable(row, col, value)])
+        return constraints
+
+
+    def preprocess(self, puzzle):
+        """
+        Preprocess a puzzle string and return its constraints.
+        """
+        self.load(puzzle)
+        self.simplify()
+        return self.constraints()
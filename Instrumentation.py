@@ -0,0 +1,75 @@
+import time
+
+# Phase -> methods timed under it, on the Sudoku and on its Propagator
+SUDOKU_PHASES = {
+    "heuristic": ("pick_random_variable", "apply_mom_heuristic", "apply_vsids_heuristic"),
+    "satisfaction": ("all_clauses_satisfied", "all_clauses_consistent"),
+    "backtracking": ("backtrack",)
+}
+PROPAGATOR_PHASES = {
+    "propagation": ("propagate",),
+    "analysis": ("analyze",)
+}
+PHASES = tuple(SUDOKU_PHASES) + tuple(PROPAGATOR_PHASES)
+
+
+class Instrumentation:
+    """
+    Call counts and time per search phase. Attaching wraps the methods of
+    each phase on the instances being solved, and detaching removes the
+    wrappers again; a solver without an Instrumentation runs the plain
+    methods and pays nothing.
+    """
+    def __init__(self) -> None:
+        self.calls = {phase: 0 for phase in PHASES}
+        self.seconds = {phase: 0.0 for phase in PHASES}
+        self.attached = []
+
+    def reset(self):
+        for phase in PHASES:
+            self.calls[phase] = 0
+            self.seconds[phase] = 0.0
+
+
+    def timed(self, phase, method):
+        calls = self.calls
+        seconds = self.seconds
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds[phase] += clock() - start
+                calls[phase] += 1
+        wrapper.__name__ = method.__name__
+        return wrapper
+
+    def instrument(self, target, phases):
+        for phase, names in phases.items():
+            for name in names:
+                setattr(target, name, self.timed(phase, getattr(target, name)))
+
+    def attach(self, sudoku, propagator=None):
+        """
+        Instrument a Sudoku and the propagator it solves on. The propagator
+        may outlive the solve, so it is remembered for detach().
+        """
+        sudoku.instrumentation = self
+        self.instrument(sudoku, SUDOKU_PHASES)
+        if propagator is not None:
+            self.instrument(propagator, PROPAGATOR_PHASES)
+            self.attached.append((propagator, PROPAGATOR_PHASES))
+
+    def detach(self):
+        while self.attached:
+            target, phases = self.attached.pop()
+            for names in phases.values():
+                for name in names:
+                    # Drop the wrapper on the instance, the class method shows through again
+                    target.__dict__.pop(name, None)
+
+
+    def record(self):
+        return {phase: {"calls": self.calls[phase], "seconds": round(self.seconds[phase], 6)} for phase in PHASES}
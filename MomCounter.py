@@ -0,0 +1,139 @@
+from array import array
+
+
+class MomCounter:
+    """
+    Incremental occurrence counts for the MOM heuristic.
+
+    For every clause that is not satisfied yet the counter keeps the number of
+    unassigned literals (its size) and, per size, how often each unassigned
+    variable occurs in open clauses of that size. Assigning a literal only
+    touches the clauses containing it or its negation. Variables are further
+    grouped by occurrence count, so the most frequent variable in the smallest
+    open clauses is found without scanning the formula.
+    """
+    def __init__(self, clauses, n_vars=None) -> None:
+        self.clauses = clauses
+        if n_vars is None:
+            n_vars = max((abs(literal) for clause in clauses for literal in clause), default=0)
+        self.occurrences = {}
+        self.sizes = []
+        self.satisfied = []
+        self.counts = {}
+        self.buckets = {}
+        self.best = {}
+        self.open_clauses = {}
+        self.values = array('b', [0]) * (n_vars + 1)
+        self.applied = []
+
+        for index, clause in enumerate(clauses):
+            size = len(clause)
+            self.sizes.append(size)
+            self.satisfied.append(0)
+            self.open_clauses[size] = self.open_clauses.get(size, 0) + 1
+            for literal in clause:
+                self.occurrences.setdefault(literal, []).append(index)
+                self.count(size, abs(literal), 1)
+        self.max_size = max(self.open_clauses, default=0)
+
+
+    def count(self, size, variable, delta):
+        counts = self.counts.setdefault(size, {})
+        buckets = self.buckets.setdefault(size, {})
+        old = counts.get(variable, 0)
+        new = old + delta
+        if old:
+            buckets[old].discard(variable)
+        if new:
+            counts[variable] = new
+            buckets.setdefault(new, set()).add(variable)
+            if new > self.best.get(size, 0):
+                self.best[size] = new
+        else:
+            del counts[variable]
+
+    def count_clause(self, index, delta, skip=None):
+        """
+        Add or remove the contribution of an open clause at its current size.
+        """
+        size = self.sizes[index]
+        for literal in self.clauses[index]:
+            variable = abs(literal)
+            if variable != skip and not self.values[variable]:
+                self.count(size, variable, delta)
+
+
+    def assign(self, literal):
+        variable = abs(literal)
+
+        for index in self.occurrences.get(literal, ()):
+            if self.satisfied[index] == 0:
+                self.count_clause(index, -1)
+                self.open_clauses[self.sizes[index]] -= 1
+            self.satisfied[index] += 1
+
+        for index in self.occurrences.get(-literal, ()):
+            if self.satisfied[index] == 0:
+                self.count_clause(index, -1)
+                self.open_clauses[self.sizes[index]] -= 1
+                self.sizes[index] -= 1
+                self.open_clauses[self.sizes[index]] = self.open_clauses.get(self.sizes[index], 0) + 1
+                self.count_clause(index, 1, skip=variable)
+            else:
+                self.sizes[index] -= 1
+
+        self.values[variable] = 1 if literal > 0 else -1
+
+    def unassign(self, literal):
+        variable = abs(literal)
+        self.values[variable] = 0
+
+        for index in self.occurrences.get(-literal, ()):
+            if self.satisfied[index] == 0:
+                self.count_clause(index, -1, skip=variable)
+                self.open_clauses[self.sizes[index]] -= 1
+                self.sizes[index] += 1
+                self.open_clauses[self.sizes[index]] = self.open_clauses.get(self.sizes[index], 0) + 1
+                self.count_clause(index, 1)
+            else:
+                self.sizes[index] += 1
+
+        for index in self.occurrences.get(literal, ()):
+            self.satisfied[index] -= 1
+            if self.satisfied[index] == 0:
+                self.open_clauses[self.sizes[index]] += 1
+                self.count_clause(index, 1)
+
+
+    def sync(self, trail):
+        """
+        Apply the literals put on the trail since the last call.
+        """
+        for literal in trail[len(self.applied):]:
+            self.assign(literal)
+            self.applied.append(literal)
+
+    def backtrack(self, trail_length):
+        """
+        Undo the applied literals beyond the given trail length.
+        """
+        while len(self.applied) > trail_length:
+            self.unassign(self.applied.pop())
+
+
+    def select(self):
+        """
+        Return the variable with the most occurrences in the open clauses of
+        minimum size, or None if every clause is satisfied.
+        """
+        for size in range(1, self.max_size + 1):
+            if not self.open_clauses.get(size):
+                continue
+            buckets = self.buckets[size]
+            best = self.best[size]
+            while best > 0 and not buckets.get(best):
+                best -= 1
+            self.best[size] = best
+            if best > 0:
+                return next(iter(buckets[best]))
+        return None
@@ -0,0 +1,243 @@
+from array import array
+
+
+class Propagator:
+    """
+    Incremental unit propagation based on two watched literals per clause.
+
+    Every clause with two or more literals watches two of its literals. When a
+    literal becomes false only the clauses watching it are visited, so a
+    propagation step never rescans the whole formula. Assignments are recorded
+    on a trail split into decision levels, which allows undoing them later.
+
+    The assignment is a flat array indexed by variable holding 1 (true),
+    -1 (false) or 0 (unassigned), so a literal is true when the product of
+    its value and the literal is positive. Watch lists are indexed by
+    literal + n_vars.
+    """
+    def __init__(self, clauses=None, n_vars=None) -> None:
+        self.clauses = list(clauses) if clauses is not None else []
+        if n_vars is None:
+            n_vars = max((abs(literal) for clause in self.clauses for literal in clause), default=0)
+        self.n_vars = n_vars
+        self.assignments = array('b', [0]) * (n_vars + 1)
+        self.watches = [[] for _ in range(2 * n_vars + 1)]
+        self.watched = [None] * len(self.clauses)
+        self.trail = []
+        self.trail_lim = []
+        self.reasons = [None] * (n_vars + 1)
+        self.levels = array('i', [0]) * (n_vars + 1)
+        self.queue_head = 0
+        self.conflict = None
+        self.n_unit_propagations = 0
+
+        for index, clause in enumerate(self.clauses):
+            if len(clause) == 0:
+                self.conflict = index
+            elif len(clause) == 1:
+                self.enqueue(clause[0], index)
+            else:
+                self.watch_clause(index, clause[0], clause[1])
+
+
+    def watch_clause(self, index, first, second):
+        self.watched[index] = [first, second]
+        self.watches[first + self.n_vars].append(index)
+        self.watches[second + self.n_vars].append(index)
+
+    def value(self, literal):
+        """
+        Return True/False if the literal is assigned, None otherwise.
+        """
+        value = self.assignments[abs(literal)] * literal
+        if value == 0:
+            return None
+        return value > 0
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+
+    def enqueue(self, literal, reason=None):
+        """
+        Assign a literal and put it on the trail. Returns False if the literal
+        is already false.
+        """
+        value = self.value(literal)
+        if value is not None:
+            if not value and reason is not None:
+                self.conflict = reason
+            return value
+        self.assignments[abs(literal)] = 1 if literal > 0 else -1
+        self.levels[abs(literal)] = len(self.trail_lim)
+        self.trail.append(literal)
+        if reason is not None:
+            self.reasons[abs(literal)] = reason
+            self.n_unit_propagations += 1
+        return True
+
+    def decide(self, literal):
+        """
+        Open a new decision level and assign the literal on it.
+        """
+        self.trail_lim.append(len(self.trail))
+        self.enqueue(literal)
+
+
+    def propagate(self):
+        """
+        Propagate all literals on the trail that have not been processed yet.
+        Returns the index of a conflicting clause, or None.
+        """
+        if self.conflict is not None:
+            return self.conflict
+
+        assignments = self.assignments
+        clauses = self.clauses
+        watched = self.watched
+        watches = self.watches
+        n_vars = self.n_vars
+
+        while self.queue_head < len(self.trail):
+            false_literal = -self.trail[self.queue_head]
+            self.queue_head += 1
+
+            watching = watches[false_literal + n_vars]
+            if not watching:
+                continue
+
+            kept = []
+            for position, index in enumerate(watching):
+                watch = watched[index]
+                other = watch[1] if watch[0] == false_literal else watch[0]
+                other_value = assignments[abs(other)] * other
+                if other_value > 0:
+                    kept.append(index)
+                    continue
+
+                # Look for a literal that is not false to watch instead
+                replacement = None
+                for literal in clauses[index]:
+                    if literal == other or literal == false_literal:
+                        continue
+                    if assignments[abs(literal)] * literal >= 0:
+                        replacement = literal
+                        break
+
+                if replacement is not None:
+                    watch[0] = other
+                    watch[1] = replacement
+                    watches[replacement + n_vars].append(index)
+                    continue
+
+                kept.append(index)
+                if other_value == 0:
+                    # Clause became unit
+                    assignments[abs(other)] = 1 if other > 0 else -1
+                    self.levels[abs(other)] = len(self.trail_lim)
+                    self.trail.append(other)
+                    self.reasons[abs(other)] = index
+                    self.n_unit_propagations += 1
+                else:
+                    # All literals false
+                    kept.extend(watching[position + 1:])
+                    watches[false_literal + n_vars] = kept
+                    self.conflict = index
+                    return index
+
+            watches[false_literal + n_vars] = kept
+
+        return None
+
+
+    def backtrack(self, level):
+        """
+        Undo all assignments above the given decision level. Returns the
+        literals that were unassigned.
+        """
+        if level >= len(self.trail_lim):
+            return []
+        start = self.trail_lim[level]
+        undone = self.trail[start:]
+        for literal in undone:
+            variable = abs(literal)
+            self.assignments[variable] = 0
+            self.reasons[variable] = None
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.queue_head = len(self.trail)
+        self.conflict = None
+        return undone
+
+
+    def analyze(self, conflict):
+        """
+        First-UIP conflict analysis on the implication graph spanned by the
+        reasons on the trail. Returns the learned clause, with the asserting
+        literal first, and the decision level to backjump to.
+        """
+        current_level = len(self.trail_lim)
+        learned = [None]
+        seen = set()
+        counter = 0
+        clause = self.clauses[conflict]
+        index = len(self.trail) - 1
+
+        while True:
+            for literal in clause:
+                variable = abs(literal)
+                if variable in seen:
+                    continue
+                seen.add(variable)
+                level = self.levels[variable]
+                if level == current_level:
+                    counter += 1
+                elif level > 0:
+                    learned.append(literal)
+
+            # Walk back to the most recent literal involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+
+        # Second watch goes on the literal of the highest remaining level
+        highest = max(range(1, len(learned)), key=lambda position: self.levels[abs(learned[position])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def learn(self, clause):
+        """
+        Add a learned clause and assert its first literal. Must be called
+        after backjumping, when all other literals are false.
+        """
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watched.append(None)
+        if len(clause) > 1:
+            self.watch_clause(index, clause[0], clause[1])
+        self.enqueue(clause[0], index)
+
+
+    def forget_learned(self, count):
+        """
+        Drop every clause added after the first count clauses together with
+        its watches. Only valid on decision level 0.
+        """
+        for index in range(count, len(self.clauses)):
+            watch = self.watched[index]
+            if watch is not None:
+                for literal in watch:
+                    self.watches[literal + self.n_vars].remove(index)
+        del self.clauses[count:]
+        del self.watched[count:]
+        self.reasons = [reason if reason is not None and reason < count else None for reason in self.reasons]
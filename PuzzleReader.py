@@ -0,0 +1,77 @@
+import io
+import os
+import gzip
+import math
+import itertools
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_puzzle_file(path):
+    """
+    Open a puzzle collection for reading text, transparently decompressing
+    gzip files whatever their extension.
+    """
+    f = open(path, 'rb')
+    if f.peek(2)[:2] == GZIP_MAGIC:
+        f = gzip.GzipFile(fileobj=f)
+    return io.TextIOWrapper(f, encoding='ascii')
+
+
+def puzzle_name(path):
+    """
+    Name of a collection used for the stats and output files:
+    data/top91.sdk.txt.gz -> top91.sdk
+    """
+    name = os.path.basename(path)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return os.path.splitext(name)[0]
+
+
+def grid_size_of(puzzle):
+    grid_size = int(math.sqrt(len(puzzle)))
+    box_size = int(math.sqrt(grid_size))
+
+    assert(grid_size * grid_size == len(puzzle) and box_size * box_size == grid_size), "Invalid grid size"
+
+    return grid_size
+
+
+def read_puzzles(path):
+    """
+    Yield the puzzles of a collection one at a time as (sudoku_id, puzzle),
+    one puzzle per line with '.' or '0' for empty cells. Blank lines and
+    lines starting with '#' are skipped, as is anything after the puzzle on
+    its line. Only the current line is held in memory.
+    """
+    sudoku_id = 0
+    length = None
+
+    with open_puzzle_file(path) as f:
+        for line_number, line in enumerate(f, 1):
+            fields = line.split(None, 1)
+            if not fields or fields[0].startswith('#'):
+                continue
+            puzzle = fields[0]
+
+            if length is None:
+                length = len(puzzle)
+            elif len(puzzle) != length:
+                raise ValueError(f"{path}:{line_number}: expected {length} cells, got {len(puzzle)}")
+
+            yield sudoku_id, puzzle
+            sudoku_id += 1
+
+
+def peek_grid_size(puzzles):
+    """
+    Determine the grid size from the first puzzle of a stream. Returns the
+    grid size and an iterator that still yields every puzzle.
+    """
+    try:
+        first = next(puzzles)
+    except StopIteration:
+        raise ValueError("No puzzles to solve") from None
+    return grid_size_of(first[1]), itertools.chain([first], puzzles)
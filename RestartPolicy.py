@@ -0,0 +1,57 @@
+SCHEDULES = ("luby", "geometric")
+
+
+def luby(index):
+    """
+    The index-th term (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    """
+    size, exponent = 1, 0
+    while size < index + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        exponent -= 1
+        index %= size
+    return 1 << exponent
+
+
+class RestartPolicy:
+    """
+    Decides when a search drops all its decisions and starts again from the
+    givens. Each run may take a number of conflicts before it is restarted:
+    unit times the Luby sequence, or unit times factor^i for the geometric
+    schedule. Both grow without bound, so the search stays complete.
+    Everything the heuristics learned (scores, learned clauses) survives a
+    restart, only the decisions are undone.
+    """
+    def __init__(self, schedule="luby", unit=100, factor=1.5) -> None:
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown restart schedule: {schedule}")
+        self.schedule = schedule
+        self.unit = unit
+        self.factor = factor
+        self.reset()
+
+    def reset(self):
+        self.n_restarts = 0
+        self.conflicts = 0
+        self.limit = self.conflict_limit(0)
+
+
+    def conflict_limit(self, run):
+        if self.schedule == "luby":
+            return self.unit * luby(run)
+        return int(self.unit * self.factor ** run)
+
+    def conflict(self):
+        """
+        Count a conflict. Returns True when the current run is used up.
+        """
+        self.conflicts += 1
+        return self.conflicts >= self.limit
+
+    def restart(self):
+        self.n_restarts += 1
+        self.conflicts = 0
+        self.limit = self.conflict_limit(self.n_restarts)
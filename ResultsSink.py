@@ -0,0 +1,98 @@
+import os
+
+LAYOUTS = ("stream", "files")
+
+
+class ResultsSink:
+    """
+    Buffers the stats lines and solutions of a batch and writes them in
+    bulk. Each stats file and solution stream is opened once per batch and
+    written in chunks of at least flush_size bytes, so the number of opens
+    and writes does not grow with the number of puzzles.
+
+    Solutions of a puzzle file go to one stream, output/<name>.out, each
+    preceded by a "c sudoku <id>" comment line. With layout="files" every
+    puzzle gets its own output/<name>/<id>.out instead, which necessarily
+    costs one open per puzzle.
+    """
+    def __init__(self, layout=None, flush_size=1 << 20) -> None:
+        self.layout = layout if layout is not None else "stream"
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown solution layout: {self.layout}")
+        self.flush_size = flush_size
+        self.files = {}
+        self.modes = {}
+        self.buffers = {}
+        self.solution_files = []
+        self.buffered = 0
+        self.n_opens = 0
+        self.n_writes = 0
+
+
+    def add(self, file_name, text, mode):
+        if file_name not in self.buffers:
+            self.buffers[file_name] = []
+            self.modes[file_name] = mode
+        self.buffers[file_name].append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.flush_size:
+            self.flush()
+
+    def add_stats(self, file_name, stats_line):
+        self.add(file_name, stats_line, "a")
+
+    def add_solution(self, file_name, sudoku_id, solution):
+        if self.layout == "files":
+            path = os.path.join(os.path.splitext(file_name)[0], f"{sudoku_id}.out")
+            self.solution_files.append((path, solution))
+            self.buffered += len(solution)
+            if self.buffered >= self.flush_size:
+                self.flush()
+        else:
+            # The stream is rewritten by every batch, like the single solution file was
+            self.add(file_name, f"c sudoku {sudoku_id}\n{solution}", "w")
+
+
+    def open(self, file_name):
+        if file_name not in self.files:
+            directory = os.path.dirname(file_name)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.files[file_name] = open(file_name, self.modes[file_name])
+            self.n_opens += 1
+        return self.files[file_name]
+
+    def flush(self):
+        for file_name, chunks in self.buffers.items():
+            if chunks:
+                stream = self.open(file_name)
+                stream.write("".join(chunks))
+                stream.flush()
+                self.n_writes += 1
+                chunks.clear()
+
+        for path, solution in self.solution_files:
+            directory = os.path.dirname(path)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(path, "w") as file:
+                file.write(solution)
+            self.n_opens += 1
+            self.n_writes += 1
+        self.solution_files = []
+        self.buffered = 0
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for stream in self.files.values():
+                stream.close()
+            self.files = {}
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
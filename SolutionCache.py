@@ -0,0 +1,236 @@
+import dbm
+import math
+import itertools
+from collections import OrderedDict
+from Encoding import Encoding
+
+# Stored instead of a solution for puzzles without one
+UNSATISFIABLE = b"unsat"
+
+
+class SolutionCache:
+    """
+    Solutions keyed on a canonical form of the puzzle, so a puzzle hits
+    the cache when an equivalent one was solved before: the same puzzle,
+    its digits relabeled, its rows permuted within their bands and its
+    columns within their stacks, or its transpose.
+
+    The canonical form is the lexicographically smallest grid those
+    symmetries reach, with the digits numbered in order of first
+    appearance. Rather than trying every permutation, the rows of a band
+    (and the columns of a stack) are sorted by a key that none of the
+    symmetries changes, and only rows with equal keys are permuted among
+    themselves. If that still leaves more than max_orderings orderings
+    the puzzle's own first ordering is used: the key stays exact for the
+    puzzle and its duplicates, it only stops matching its relatives.
+
+    Recently used entries are kept in memory up to capacity. With a path
+    every entry is also stored in a dbm file that outlives the process;
+    memory misses fall through to it.
+    """
+    def __init__(self, grid_size, capacity=4096, path=None, writable=True, max_orderings=2048) -> None:
+        self.grid_size = grid_size
+        self.box_size = int(round(grid_size ** 0.5))
+        self.encoding = Encoding(grid_size)
+        self.capacity = capacity
+        self.max_orderings = max_orderings
+        self.entries = OrderedDict()
+        self.last_form = None
+        self.writable = writable
+        self.disk = None
+        if path is not None:
+            try:
+                self.disk = dbm.open(path, "c" if writable else "r")
+            except dbm.error:
+                # Nothing stored yet, and not ours to create
+                self.disk = None
+        self.n_hits = 0
+        self.n_disk_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0
+
+
+    def orderings(self, grid):
+        """
+        Every row and column order to try for a grid: per band the rows
+        sorted by their key, with rows of equal keys in every order, and
+        the same for the columns of each stack.
+        """
+        n = self.grid_size
+        b = self.box_size
+        frequency = [0] * (n + 1)
+        row_count = [0] * n
+        col_count = [0] * n
+        for cell, value in enumerate(grid):
+            if value:
+                frequency[value] += 1
+                row_count[cell // n] += 1
+                col_count[cell % n] += 1
+
+        def row_key(row):
+            return tuple(tuple(sorted((col_count[col], frequency[grid[row * n + col]]) for col in range(stack, stack + b) if grid[row * n + col]))
+                         for stack in range(0, n, b))
+
+        def col_key(col):
+            return tuple(tuple(sorted((row_count[row], frequency[grid[row * n + col]]) for row in range(band, band + b) if grid[row * n + col]))
+                         for band in range(0, n, b))
+
+        def group_orders(key):
+            # Per band or stack: the ways to order its lines, ties permuted
+            groups = []
+            for start in range(0, n, b):
+                lines = sorted(range(start, start + b), key=key)
+                ties = [list(tied) for _, tied in itertools.groupby(lines, key=key)]
+                groups.append([list(itertools.chain.from_iterable(order)) for order in itertools.product(*(itertools.permutations(tied) for tied in ties))])
+            return groups
+
+        row_groups = group_orders(row_key)
+        col_groups = group_orders(col_key)
+        count = math.prod(len(orders) for orders in row_groups + col_groups)
+        if count > self.max_orderings:
+            row_groups = [orders[:1] for orders in row_groups]
+            col_groups = [orders[:1] for orders in col_groups]
+
+        row_orders = [list(itertools.chain.from_iterable(order)) for order in itertools.product(*row_groups)]
+        col_orders = [list(itertools.chain.from_iterable(order)) for order in itertools.product(*col_groups)]
+        return row_orders, col_orders
+
+    def relabel(self, grid, rows, cols, best):
+        """
+        Read the grid in the given order with the digits numbered by first
+        appearance. Returns the key and the digit mapping, or None as soon
+        as the key is certain to be larger than best.
+        """
+        n = self.grid_size
+        labels = {}
+        key = bytearray()
+        smaller = best is None
+        for row in rows:
+            offset = row * n
+            for col in cols:
+                value = grid[offset + col]
+                if value:
+                    label = labels.get(value)
+                    if label is None:
+                        label = labels[value] = len(labels) + 1
+                else:
+                    label = 0
+                if not smaller:
+                    other = best[len(key)]
+                    if label > other:
+                        return None
+                    smaller = label < other
+                key.append(label)
+        if not smaller:
+            # Equal to best
+            return None
+        return bytes(key), labels
+
+    def canonical_form(self, puzzle):
+        """
+        Return the canonical key of a puzzle string and the transformation
+        taking the puzzle to it: (transposed, rows, cols, labels). The last
+        one is remembered, since a miss is followed by a put.
+        """
+        if self.last_form is not None and self.last_form[0] == puzzle:
+            return self.last_form[1]
+        n = self.grid_size
+        values = [self.encoding.value(char) for char in puzzle]
+        best = None
+        transform = None
+        for transposed in (False, True):
+            grid = values if not transposed else [values[col * n + row] for row in range(n) for col in range(n)]
+            row_orders, col_orders = self.orderings(grid)
+            for rows in row_orders:
+                for cols in col_orders:
+                    relabeled = self.relabel(grid, rows, cols, best)
+                    if relabeled is not None:
+                        best, labels = relabeled
+                        transform = transposed, rows, cols, labels
+        self.last_form = puzzle, (best, transform)
+        return best, transform
+
+    def map_back(self, solution, transform):
+        """
+        Turn a solution of the canonical puzzle into one of the puzzle:
+        a list of values in row-major order.
+        """
+        n = self.grid_size
+        transposed, rows, cols, labels = transform
+        # Values missing from the puzzle take the remaining labels in order
+        free = iter(value for value in range(1, n + 1) if value not in labels)
+        inverse = {label: value for value, label in labels.items()}
+        for label in range(len(labels) + 1, n + 1):
+            inverse[label] = next(free)
+
+        values = [0] * (n * n)
+        for i, row in enumerate(rows):
+            for j, col in enumerate(cols):
+                cell = col * n + row if transposed else row * n + col
+                values[cell] = inverse[solution[i * n + j]]
+        return values
+
+    def canonical_solution(self, values, transform):
+        """
+        The inverse of map_back: a solution of the puzzle as a solution of
+        the canonical puzzle.
+        """
+        n = self.grid_size
+        transposed, rows, cols, labels = transform
+        labels = dict(labels)
+        for value in range(1, n + 1):
+            if value not in labels:
+                labels[value] = len(labels) + 1
+        return bytes(labels[values[col * n + row] if transposed else values[row * n + col]] for row in rows for col in cols)
+
+
+    def lookup(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.n_hits += 1
+            return self.entries[key]
+        if self.disk is not None and key in self.disk:
+            solution = self.disk[key]
+            self.n_disk_hits += 1
+            self.remember(key, solution)
+            return solution
+        self.n_misses += 1
+        return None
+
+    def remember(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.n_evictions += 1
+
+    def get(self, puzzle):
+        """
+        Solution of a puzzle string as a list of values, UNSATISFIABLE, or
+        None if neither it nor an equivalent puzzle is cached.
+        """
+        key, transform = self.canonical_form(puzzle)
+        solution = self.lookup(key)
+        if solution is None or solution == UNSATISFIABLE:
+            return solution
+        return self.map_back(solution, transform)
+
+    def put(self, puzzle, values):
+        """
+        Cache the solution of a puzzle string, or UNSATISFIABLE.
+        """
+        key, transform = self.canonical_form(puzzle)
+        solution = values if values == UNSATISFIABLE else self.canonical_solution(values, transform)
+        self.remember(key, solution)
+        if self.disk is not None and self.writable:
+            self.disk[key] = solution
+
+
+    def report(self):
+        return (f"Solution cache: {self.n_hits} hits, {self.n_disk_hits} disk hits, "
+                f"{self.n_misses} misses, {self.n_evictions} evictions")
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import signal
+import asyncio
+import concurrent.futures
+from Solvers import make_solvers
+from PuzzleReader import grid_size_of
+
+# Solvers of a worker process, by (grid size, strategy)
+service_solvers = {}
+
+
+def init_service_worker(grid_sizes, strategies, options=None):
+    """
+    Build the clause database of every grid size once per worker process
+    and keep a solver per strategy on it, so requests only pay for the
+    search. Workers stay silent.
+    """
+    options = options if options is not None else {}
+    sys.stdout = open(os.devnull, 'w')
+    for grid_size in grid_sizes:
+        for strategy, solver in make_solvers(None, grid_size, "service", strategies, options).items():
+            service_solvers[grid_size, strategy] = solver
+
+
+def warm_up():
+    return os.getpid()
+
+
+def solve_request(request_id, puzzle, grid_size, strategy):
+    """
+    Solve one puzzle in a worker and return the response to send.
+    """
+    solver = service_solvers[grid_size, strategy]
+    encoding = solver.encoding
+    sudoku = solver.solve(encoding.givens(puzzle), request_id)
+    status = sudoku.status()
+
+    response = {"id": request_id, "status": status, "strategy": strategy}
+    if status == "SAT":
+        response["grid"] = "".join(encoding.char(value) for value in sudoku.solution_values())
+        response["dimacs"] = sudoku.solution_dimacs()
+    response["stats"] = sudoku.stats_record()
+    return response
+
+
+class SolverService:
+    """
+    Long-running solver behind a local socket. Requests and responses are
+    JSON objects, one per line:
+
+        {"id": 1, "puzzle": "..3.2.6..9..3.5..1..", "strategy": 4}
+        {"id": 1, "status": "SAT", "strategy": 4, "grid": "483921657...", "dimacs": "p cnf ...", "stats": {...}}
+
+    id and strategy are optional. Puzzles are solved in a pool of worker
+    processes that build the rules of every grid size before the service
+    accepts connections, so a request costs only its search. Requests on
+    one connection are solved concurrently and answered as they finish,
+    matched by id: a string or integer, unique among the connection's
+    requests in flight. Requests without one get the next number not in
+    flight. Errors carry the id whenever the request had one. At most
+    max_pending requests are admitted at a time; any beyond that are
+    turned away at once with an "overloaded" error instead of queueing
+    without bound.
+    """
+    def __init__(self, grid_sizes=(4, 9, 16), strategies=(4,), default_strategy=None, workers=None, max_pending=None, options=None) -> None:
+        self.grid_sizes = tuple(grid_sizes)
+        self.strategies = tuple(strategies)
+        self.default_strategy = default_strategy if default_strategy is not None else self.strategies[0]
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.max_pending = max_pending if max_pending is not None else 4 * self.workers
+        self.options = options if options is not None else {}
+        self.pool = None
+        self.pending = 0
+        self.next_id = 0
+        self.n_requests = 0
+        self.n_rejected = 0
+
+
+    async def start_pool(self):
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            self.workers, initializer=init_service_worker, initargs=(self.grid_sizes, self.strategies, self.options))
+        loop = asyncio.get_running_loop()
+        # Wait until every worker has built its solvers
+        await asyncio.gather(*(loop.run_in_executor(self.pool, warm_up) for _ in range(self.workers)))
+
+    def load(self, line):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Invalid JSON: {error}") from None
+        if not isinstance(request, dict):
+            raise ValueError("Expected an object with a puzzle string")
+        return request
+
+    def assign_id(self, request, in_flight):
+        """
+        The id a request is answered with, added to the ids in flight on
+        its connection. Raises ValueError for an id that cannot be told
+        apart from another.
+        """
+        request_id = request.get("id")
+        if request_id is None:
+            while self.next_id in in_flight:
+                self.next_id += 1
+            request_id = self.next_id
+            self.next_id += 1
+        elif isinstance(request_id, bool) or not isinstance(request_id, (int, str)):
+            raise ValueError("The id must be a string or an integer")
+        elif request_id in in_flight:
+            raise ValueError(f"A request with id {request_id!r} is already in flight")
+        in_flight.add(request_id)
+        return request_id
+
+    def parse(self, request):
+        """
+        Validate a request. Returns (puzzle, grid_size, strategy), or raises
+        ValueError with the message to send back.
+        """
+        if not isinstance(request.get("puzzle"), str):
+            raise ValueError("Expected an object with a puzzle string")
+        puzzle = request["puzzle"].strip()
+        try:
+            grid_size = grid_size_of(puzzle)
+        except AssertionError:
+            raise ValueError(f"Puzzle of {len(puzzle)} cells is not a square grid") from None
+        if grid_size not in self.grid_sizes:
+            raise ValueError(f"Grid size {grid_size} is not served")
+        strategy = request.get("strategy", self.default_strategy)
+        if strategy not in self.strategies:
+            raise ValueError(f"Strategy {strategy} is not served")
+        return puzzle, grid_size, strategy
+
+    async def answer(self, line, writer, in_flight):
+        request_id = None
+        assigned = False
+        try:
+            request = self.load(line)
+            # Echoed in any error below, even one about the id itself
+            request_id = request.get("id")
+            request_id = self.assign_id(request, in_flight)
+            assigned = True
+            puzzle, grid_size, strategy = self.parse(request)
+            if self.pending >= self.max_pending:
+                self.n_rejected += 1
+                response = {"id": request_id, "error": "overloaded"}
+            else:
+                self.pending += 1
+                self.n_requests += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    response = await loop.run_in_executor(self.pool, solve_request, request_id, puzzle, grid_size, strategy)
+                finally:
+                    self.pending -= 1
+        except ValueError as error:
+            response = {"id": request_id, "error": str(error)}
+        except Exception as error:
+            response = {"id": request_id, "error": f"{type(error).__name__}: {error}"}
+
+        try:
+            if not writer.is_closing():
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        finally:
+            if assigned:
+                in_flight.discard(request_id)
+
+    async def handle(self, reader, writer):
+        tasks = set()
+        in_flight = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.answer(line, writer, in_flight))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Shutting down; the stream callback would log a cancelled handler as an error
+            pass
+        finally:
+            writer.close()
+
+
+    async def serve(self, path=None, host="127.0.0.1", port=None):
+        """
+        Serve on a Unix socket at path, or on host:port, until interrupted
+        or terminated.
+        """
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        await self.start_pool()
+        try:
+            if path is not None:
+                server = await asyncio.start_unix_server(self.handle, path=path)
+                address = path
+            else:
+                server = await asyncio.start_server(self.handle, host, port)
+                address = f"{host}:{server.sockets[0].getsockname()[1]}"
+            print(f"Serving grid sizes {', '.join(map(str, self.grid_sizes))} with {self.workers} workers on {address}", flush=True)
+            async with server:
+                await stop.wait()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if path is not None and os.path.exists(path):
+                os.unlink(path)
+
+    def run(self, path=None, host="127.0.0.1", port=None):
+        try:
+            asyncio.run(self.serve(path, host, port))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,45 @@
+import sys
+from Encoding import Encoding
+from ClauseDatabase import ClauseDatabase, load_cached_database
+from BatchSolver import BatchSolver
+from ExactCover import ExactCoverSolver, EXACT_COVER
+from Dimacs import read_dimacs
+
+
+def load_database(rules_file, grid_size):
+    """
+    Compiled clause database for the rules. Rules files are preprocessed
+    and read through the binary cache next to them, otherwise the rules are
+    generated for the grid size, already clean, without any parsing.
+    """
+    encoding = Encoding(grid_size)
+    if rules_file is None:
+        return ClauseDatabase(map(tuple, encoding.rules()), n_vars=encoding.n_vars, compiled=True)
+
+    def build():
+        _, rules = read_dimacs(rules_file)
+        database = ClauseDatabase(encoding.dense_clauses(rules), n_vars=encoding.n_vars)
+        # Only on a cache miss, what the preprocessing removed from the rules file
+        print(f"{rules_file}: {database.preprocessing_report}", file=sys.stderr)
+        return database
+    return load_cached_database(rules_file, build, key=grid_size)
+
+
+def make_solvers(rules_file, grid_size, filename, strategies, options=None):
+    """
+    One solver per strategy. The SAT strategies share one clause database,
+    which is only loaded if one of them is used, and take the BatchSolver
+    keyword arguments in options; the exact cover engine works from the
+    grid size alone.
+    """
+    options = options if options is not None else {}
+    database = None
+    solvers = {}
+    for strategy in strategies:
+        if strategy == EXACT_COVER:
+            solvers[strategy] = ExactCoverSolver(grid_size, filename, heuristic_id=strategy, persist=False, budget=options.get("budget"), stats_format=options.get("stats_format"))
+            continue
+        if database is None:
+            database = load_database(rules_file, grid_size)
+        solvers[strategy] = BatchSolver(database, grid_size, filename, heuristic_id=strategy, persist=False, **options)
+    return solvers
@@ -1,7 +0,0 @@
-class Statistics:
-     def __init__(self):
-        self.runtime = 0.0
-        self.n_backtracks = 0
-        self.n_splits = 0
-        self.n_conflicts = 0
-
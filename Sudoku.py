@@ -1,9 +1,23 @@
 import os
+import json
 import time
 import random
+from array import array
+from Encoding import Encoding
+from Propagator import Propagator
+from VariableOrder import VariableOrder
+from MomCounter import MomCounter
+from CnfPreprocessor import CnfPreprocessor
+from ClauseEvaluator import ClauseEvaluator
+
+STRATEGIES = {1: "basic_dpll", 2: "mom_dpll", 3: "vsids_dpll", 4: "cdcl"}
+# UNKNOWN: the search was cancelled or ran out of budget before an answer
+STATUSES = ("SAT", "UNSAT", "UNKNOWN")
+# lines: one positional line per solve, json: one JSON record per line
+STATS_FORMATS = ("lines", "json")
 
 class Sudoku:
-    def __init__(self, rules=None, constraints=None, clauses=None, grid_size=None, n_vars=None, filename=None, heuristic_id=None, id=None) -> None:
+    def __init__(self, rules=None, constraints=None, clauses=None, grid_size=None, n_vars=None, filename=None, heuristic_id=None, id=None, encoding=None) -> None:
         self.id = id if id is not None else -1
         self.heuristic_id = heuristic_id if heuristic_id is not None else -1
         self.comment = []
@@ -12,137 +26,157 @@ class Sudoku:
         self.rules = rules if rules is not None else []
         self.constraints = constraints if constraints is not None else []
         self.clauses = clauses if clauses is not None else []
-        self.assignments = {}
+        self.assignments = array('b', [0]) * (self.n_vars + 1)
         self.satisfiable = True
         self.grid_size = grid_size if grid_size is not None else None
+        self.encoding = encoding if encoding is not None else (Encoding(grid_size) if grid_size is not None else None)
         self.split_vars = []
         self.candidate_vars = []
         self.variable_scores = {i: 0 for i in range(1, n_vars + 1)}
         self.conflicting_clauses = []
+        self.propagator = None
+        self.evaluator = None
+        self.vsids_order = None
+        self.score_increment = 1.0
+        self.mom_counter = None
+        self.assumptions = []
+        self.root_level = 0
+        self.propagation_offset = 0
+        self.persist = True
+        self.stats_format = "lines"
+        self.instrumentation = None
+        self.phases = None
+        self.preprocessing = None
+        self.cached = False
+        self.cancel = None
+        self.cancelled = False
+        self.budget = None
+        self.out_of_budget = False
+        self.rng = random.Random()
+        self.restart_policy = None
         #self.split_assignments = {}
         # Performence related
         self.runtime = 0.0
         self.n_backtracks = 0
         self.n_splits = 0
         self.n_conflicts = 0
+        self.n_learned = 0
+        self.n_unit_propagations = 0
+        self.n_restarts = 0
+        self.stack_depth = 0
+        self.max_stack_depth = 0
 
-    def clone(self):    
-        from copy import deepcopy
-        sudoku_copy = Sudoku(
-            rules=deepcopy(self.rules),
-            constraints=deepcopy(self.constraints),
-            clauses=deepcopy(self.clauses),
-            grid_size=self.grid_size,
-            n_vars=self.n_vars
-        )
-        sudoku_copy.id = self.id
-        sudoku_copy.heuristic_id = self.heuristic_id
-        sudoku_copy.assignments = deepcopy(self.assignments)
-        sudoku_copy.split_vars = deepcopy(self.split_vars)
-        sudoku_copy.satisfiable = self.satisfiable
-        sudoku_copy.runtime = self.runtime
-        sudoku_copy.n_splits = self.n_splits
-        sudoku_copy.n_backtracks = self.n_backtracks
-        sudoku_copy.n_conflicts = self.n_conflicts
-        sudoku_copy.variable_scores = self.variable_scores.copy()
-        #sudoku_copy.conflicting_clauses = self.conflicting_clauses.copy()
-        sudoku_copy.conflicting_clauses = deepcopy(self.conflicting_clauses)
-        return sudoku_copy
-    
-
-    def remove_tautologies(self):
-        for clause in self.clauses:
-            literal_set = set(clause)
-
-            # Tautology
-            if any(-literal in literal_set for literal in literal_set):
-                self.clauses.remove(clause)
-
-    
     def simplify_unit_clauses(self):
-        unit_clauses = [clause for clause in self.clauses if len(clause) == 1]
-        for clause in unit_clauses:
-            unit_literal = clause[0]
-            variable = abs(unit_literal)
-            value = unit_literal > 0
-
-            self.assignments[variable] = value
-
-        self.clauses = [clause for clause in self.clauses if len(clause) != 1]
-
-        true_literals = {literal if value else -literal for literal, value in self.assignments.items() if value}
-        false_literals = {-literal if value else literal for literal, value in self.assignments.items() if not value}
-
-        removed_clauses = []
-        updated_clauses = []
-        conflicting_clauses = []
+        """
+        Run unit propagation on the watched-literal engine. Only the clauses
+        watching a newly falsified literal are visited.
+        """
+        conflict = self.propagator.propagate()
+        if conflict is not None:
+            self.conflicting_clauses.append(self.clauses[conflict])
+            self.satisfiable = False
 
-        for clause in self.clauses:
-            modified_clause = []
-            remove_clause = False
 
-            for literal in clause:
-                if literal in true_literals:
-                    removed_clauses.append(clause)
-                    remove_clause = True
-                    break
-                elif literal in false_literals:
-                    continue
-                elif abs(literal) in false_literals:
-                    remove_clause = True
-                    removed_clauses.append(clause)
-                    break
-                elif abs(literal) in true_literals:
-                    continue
-                else:
-                    modified_clause.append(literal)
+    def backtrack(self, level):
+        """
+        Undo the trail above the given level and update the heuristics'
+        bookkeeping for the freed variables.
+        """
+        undone = self.propagator.backtrack(level)
+        if self.vsids_order is not None:
+            for literal in undone:
+                self.vsids_order.insert(abs(literal))
+        if self.mom_counter is not None:
+            self.mom_counter.backtrack(len(self.propagator.trail))
+
+
+    def init_simplification(self, backend=None):
+        preprocessor = CnfPreprocessor(self.clauses)
+        self.clauses = preprocessor.run()
+        self.preprocessing = preprocessor.summary()
+
+        self.propagator = Propagator(self.clauses, self.n_vars)
+        self.evaluator = ClauseEvaluator(self.clauses, self.n_vars, backend)
+        self.assignments = self.propagator.assignments
+        self.clauses = self.propagator.clauses
+        self.simplify_unit_clauses()
 
-            if not remove_clause:
-                # If empty clause found, sudoku not satisfiable
-                if not modified_clause:
-                    conflicting_clauses.append(clause)
-                    self.satisfiable = False
-                updated_clauses.append(modified_clause)
+    def init_assumptions(self, propagator):
+        """
+        Solve on top of a propagator that already holds the rules. The givens
+        are asserted as assumptions on their own decision level, so the rules
+        are neither copied nor re-watched and backtracking to level 0
+        leaves the propagator ready for the next puzzle.
+        """
+        self.propagator = propagator
+        self.assignments = propagator.assignments
+        self.clauses = propagator.clauses
+        self.propagation_offset = propagator.n_unit_propagations
+        self.assumptions = [clause[0] for clause in self.constraints]
+        self.root_level = propagator.decision_level() + 1
+        self.assume()
+
+    def assume(self):
+        """
+        Open the assumption level and assert every given on it.
+        """
+        self.propagator.trail_lim.append(len(self.propagator.trail))
+        for literal in self.assumptions:
+            if not self.propagator.enqueue(literal):
+                self.satisfiable = False
+                return False
+        self.simplify_unit_clauses()
+        return self.satisfiable
 
-        unit_clauses_left = [clause for clause in updated_clauses if len(clause) == 1]
-        self.clauses = updated_clauses
 
-        if conflicting_clauses:
-            self.conflicting_clauses.extend(conflicting_clauses)
+    def should_stop(self):
+        """
+        True once the search has been cancelled from outside, e.g. because
+        another strategy already solved the puzzle, or has used up its
+        budget.
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            self.cancelled = True
+        elif self.budget is not None and self.budget.exhausted(self.n_splits, self.n_conflicts):
+            self.out_of_budget = True
+        return self.cancelled or self.out_of_budget
 
-        if unit_clauses_left:
-            self.simplify_unit_clauses()
+    def status(self):
+        if self.cancelled or self.out_of_budget:
+            return "UNKNOWN"
+        return "SAT" if self.satisfiable else "UNSAT"
 
 
-    def init_simplification(self):
-        self.remove_tautologies()
+    def restart_due(self):
+        return self.restart_policy is not None and self.restart_policy.conflict()
 
-        self.simplify_unit_clauses()
+    def restart(self):
+        """
+        Undo every decision but keep the givens, the heuristic scores and
+        the learned clauses.
+        """
+        self.backtrack(self.root_level)
+        self.satisfiable = True
+        self.conflicting_clauses = []
+        self.restart_policy.restart()
+        self.n_restarts += 1
 
 
     def get_candidate_variables(self):
-        all_variables = set()
-        for row in range(1, self.grid_size + 1):
-            for col in range(1, self.grid_size + 1):
-                for val in range(1, self.grid_size + 1):
-                    variable = int(f"{row}{col}{val}")
-                    all_variables.add(variable)
-
-        assigned_variables = set(self.assignments.keys())
-        candidate_variables = list(all_variables - assigned_variables)
-        self.split_vars = candidate_variables
+        assignments = self.assignments
+        self.split_vars = [variable for variable in range(1, self.n_vars + 1) if not assignments[variable]]
 
             
     def all_clauses_satisfied(self):
+        if self.evaluator is not None:
+            return self.evaluator.satisfied(self.assignments)
         if not self.clauses:
             return True
+        assignments = self.assignments
         for clause in self.clauses:
             satisfied = False
             for literal in clause:
-                variable = abs(literal)
-                value = self.assignments.get(variable, None)
-
-                if value is not None and ((literal > 0 and value) or (literal < 0 and not value)):
+                if assignments[abs(literal)] * literal > 0:
                     satisfied = True
                     break
 
@@ -153,74 +187,77 @@ class Sudoku:
 
 
     def all_clauses_consistent(self):
-        return all(len(clause) > 0 for clause in self.clauses)
-        for clause in sudoku.clauses:
-            if len(clause) == 0:
-                return False
-
-
+        return self.propagator.conflict is None
 
-    def splitting(self, heuristic):
-        if self.all_clauses_satisfied():
-            print("Solution found!")
-            return True
 
-        if not self.all_clauses_consistent():
-            #print("Conflict encountered, backtracking...")
-            self.n_conflicts += 1
-            return False
 
-        # Step 3: Perform unit propagation
-        self.simplify_unit_clauses()
+    def iterative_splitting(self, heuristic):
+        """
+        DPLL on a single mutable state, driven by an explicit stack of
+        decisions. Each decision opens a level on the propagator's trail and
+        a failed branch is undone by backtracking to that level. Each stack
+        frame holds the decision variable, the trail level to backtrack to
+        and whether the False branch has been tried already.
+        """
+        stack = []
+        self.stack_depth = 0
 
-        # Step 4: Check if further simplification has satisfied the problem
-        if self.all_clauses_satisfied():
-            print("Solution found after unit propagation!")
-            return True
+        while True:
+            if self.all_clauses_satisfied():
+                print("Solution found!")
+                return True
 
-        #variable = pick_random_variable(sudoku)
-        variable = heuristic()
-        if variable is None:
-            return False
-        print(f"Split Vars available before removal: {self.split_vars}")
-        self.split_vars.remove(variable)
-
-        # Step 6: Try assigning True and recursively solve
-        #print(f"Splitting on variable: {variable} with True")
-        self.n_splits += 1
-        #self.assignments[variable] = True
-        sudoku_cloned = self.clone()  # Clone Sudoku for backtracking
-        sudoku_cloned.assignments[variable] = True
-        sudoku_cloned.simplify_unit_clauses()
-        
-        if sudoku_cloned.splitting(heuristic):
-            self.assignments = sudoku_cloned.assignments
-            return True
+            if self.should_stop():
+                return False
 
-        # Step 7: Try assigning False if True didn't work
-        #print(f"Splitting on variable: {variable} with False")
-        self.n_splits += 1
-        #self.assignments[variable] = False
-        sudoku_cloned = self.clone()  # Clone Sudoku for backtracking
-        sudoku_cloned.assignments[variable] = False
-        sudoku_cloned.simplify_unit_clauses()
+            if not self.all_clauses_consistent():
+                self.n_conflicts += 1
+                if stack and self.restart_due():
+                    if heuristic == self.apply_vsids_heuristic:
+                        self.update_vsids_scores(self.conflicting_clauses)
+                        self.decay_vsids_scores()
+                    self.restart()
+                    stack = []
+                    self.stack_depth = 0
+                    continue
+            else:
+                variable = heuristic()
+                if variable is not None:
+                    stack.append([variable, self.propagator.decision_level(), False])
+                    self.stack_depth = len(stack)
+                    self.max_stack_depth = max(self.max_stack_depth, self.stack_depth)
+
+                    self.n_splits += 1
+                    self.propagator.decide(variable)
+                    self.simplify_unit_clauses()
+                    continue
 
-        if sudoku_cloned.splitting(heuristic):
-            self.assignments = sudoku_cloned.assignments
-            return True
+            # Current branch failed, unwind to the next untried branch
+            while stack:
+                frame = stack[-1]
+                variable, level, tried_false = frame
+                self.backtrack(level)
+                self.satisfiable = True
+
+                if not tried_false:
+                    frame[2] = True
+                    self.n_splits += 1
+                    self.propagator.decide(-variable)
+                    self.simplify_unit_clauses()
+                    break
 
-        # Step 8: If both fail, backtrack
-        print(f"Backtracking on variable: {variable}")
-        #del self.assignments[variable]
-        self.n_backtracks += 1
+                stack.pop()
+                self.stack_depth = len(stack)
+                self.n_backtracks += 1
 
-        if self.conflicting_clauses:
-            if heuristic == self.apply_vsids_heuristic:
-                self.update_vsids_scores(self.conflicting_clauses)
-                self.decay_vsids_scores()
-            self.conflicting_clauses = []
-            self.n_conflicts += 1
-        return False
+                if self.conflicting_clauses:
+                    if heuristic == self.apply_vsids_heuristic:
+                        self.update_vsids_scores(self.conflicting_clauses)
+                        self.decay_vsids_scores()
+                    self.conflicting_clauses = []
+                    self.n_conflicts += 1
+            else:
+                return False
 
 
 
@@ -230,20 +267,25 @@ class Sudoku:
     # BASIC
 
     def pick_random_variable(self):
-        return random.choice(self.split_vars)
+        unassigned_vars = [v for v in self.split_vars if not self.assignments[v]]
+        if not unassigned_vars:
+            return None
+        return self.rng.choice(unassigned_vars)
 
     def basic_dpll(self):
         start_time = time.time()
 
         self.get_candidate_variables()
 
-        self.splitting(self.pick_random_variable)
+        if not self.iterative_splitting(self.pick_random_variable):
+            self.satisfiable = False
 
         end_time = time.time()
         self.runtime = end_time - start_time
 
         #self.print_solved_sudoku()
-        self.output_solution()
+        if self.satisfiable:
+            self.output_solution()
         self.save_performence_stats()
 
 
@@ -252,37 +294,24 @@ class Sudoku:
 
     def apply_mom_heuristic(self):
         """
-        Apply the Maximum Occurrence in the remaining clauses (MOM) heuristic
-        to choose the next variable to split on.
+        Apply the Maximum Occurrence in clauses of Minimum size (MOM) heuristic
+        to choose the next variable to split on. The occurrence counts are
+        kept up to date incrementally from the propagator's trail.
         """
-        # Step 1: Count the occurrences of each variable in the remaining clauses
-        variable_count = {}
+        if self.mom_counter is None:
+            self.mom_counter = MomCounter(self.clauses, self.n_vars)
+        self.mom_counter.sync(self.propagator.trail)
 
-        for clause in self.clauses:
-            for literal in clause:
-                variable = abs(literal)  # Ignore the sign, consider only the variable itself
-                #if variable not in self.assignments:  # Only consider unassigned variables
-                if variable in self.split_vars:
-                    if variable not in variable_count:
-                        variable_count[variable] = 0
-                    variable_count[variable] += 1
-
-        # Step 2: Choose the variable that appears in the most clauses
-        if variable_count:
-            selected_variable = max(variable_count, key=variable_count.get)
-            print(f"Selected variable (MOM heuristic): {selected_variable}")
-            return selected_variable
-        else:
-            # If no unassigned variables, the puzzle is either solved or unsatisfiable
-            print("No more variables to split on.")
-            return None
+        # None if no unassigned variables, the puzzle is either solved or unsatisfiable
+        return self.mom_counter.select()
 
     def mom_dpll(self):
         start_time = time.time()
 
         self.get_candidate_variables()
 
-        self.splitting(self.apply_mom_heuristic)
+        if not self.iterative_splitting(self.apply_mom_heuristic):
+            self.satisfiable = False
 
         end_time = time.time()
         self.runtime = end_time - start_time
@@ -301,33 +330,43 @@ class Sudoku:
         for clause in conflicting_clauses:
             for literal in clause:
                 variable = abs(literal)
-                if variable in self.variable_scores:
-                    self.variable_scores[variable] += 1
+                self.variable_scores[variable] = self.variable_scores.get(variable, 0) + self.score_increment
+                if self.vsids_order is not None:
+                    self.vsids_order.increase(variable)
 
     def decay_vsids_scores(self, decay_factor=0.95):
         """
-        Apply decay to all VSIDS scores.
+        Decay all VSIDS scores by growing the increment of future bumps
+        instead of touching every score. Scores are rescaled once the
+        increment gets too large, which keeps their order intact.
         """
-        for variable in self.variable_scores:
-            self.variable_scores[variable] *= decay_factor
+        self.score_increment /= decay_factor
+        if self.score_increment > 1e100:
+            for variable in self.variable_scores:
+                self.variable_scores[variable] *= 1e-100
+            self.score_increment *= 1e-100
 
     def apply_vsids_heuristic(self):
         """
         Select the variable with the highest VSIDS score.
         """
-        unassigned_vars = [v for v in self.split_vars if v not in self.assignments]
-        if not unassigned_vars:
-            return None
+        if self.vsids_order is None:
+            self.vsids_order = VariableOrder(self.variable_scores, self.split_vars)
 
-        # Select the variable with the highest VSIDS score
-        return max(unassigned_vars, key=lambda var: self.variable_scores.get(var, 0))
+        # Assigned variables are dropped lazily when they reach the top
+        while self.vsids_order:
+            variable = self.vsids_order.pop()
+            if not self.assignments[variable]:
+                return variable
+        return None
 
     def vsids_dpll(self):
         start_time = time.time()
 
         self.get_candidate_variables()
 
-        self.splitting(self.apply_vsids_heuristic)
+        if not self.iterative_splitting(self.apply_vsids_heuristic):
+            self.satisfiable = False
 
         end_time = time.time()
         self.runtime = end_time - start_time
@@ -337,17 +376,148 @@ class Sudoku:
 
 
 
+    # CDCL
+
+    def cdcl_search(self):
+        """
+        Conflict-driven clause learning. Every conflict is analysed down to
+        its first unique implication point, the resulting clause is learned
+        and the search jumps back to the second highest level in that clause
+        instead of undoing only the last decision.
+        """
+        propagator = self.propagator
+
+        while True:
+            if self.should_stop():
+                return False
+
+            conflict = propagator.propagate()
+
+            if conflict is not None:
+                self.n_conflicts += 1
+                if propagator.decision_level() <= self.root_level:
+                    self.satisfiable = False
+                    return False
+
+                learned, level = propagator.analyze(conflict)
+                self.update_vsids_scores([learned])
+                self.decay_vsids_scores()
+
+                self.backtrack(level)
+                propagator.learn(learned)
+                self.n_backtracks += 1
+                self.n_learned += 1
+
+                # Jumped below the assumptions, assert them again
+                if level < self.root_level:
+                    if propagator.propagate() is not None or not self.assume():
+                        self.satisfiable = False
+                        return False
+                elif self.restart_due():
+                    self.restart()
+                continue
+
+            variable = self.apply_vsids_heuristic()
+            if variable is None:
+                return self.all_clauses_satisfied()
+
+            self.n_splits += 1
+            propagator.decide(variable)
+
+    def cdcl(self):
+        start_time = time.time()
+
+        self.get_candidate_variables()
+
+        if self.cdcl_search():
+            print("Solution found!")
+        else:
+            self.satisfiable = False
+
+        end_time = time.time()
+        self.runtime = end_time - start_time
+
+        #self.print_solved_sudoku()
+        self.save_performence_stats()
+
+
 
-    def save_performence_stats(self, backtrack_count, split_count, conflict_count, unit_clauses_resolved):
-        if not os.path.exists("results"):
-            os.makedirs("results")
 
-        stats_file_name = os.path.join("results", f"{self.filename}_heuristic_{self.heuristic_id}.txt")
+    def solve(self, strategy):
+        getattr(self, STRATEGIES[strategy])()
+
+
+    def stats_file_name(self):
+        extension = "jsonl" if self.stats_format == "json" else "txt"
+        return os.path.join("results", f"{self.filename}_heuristic_{self.heuristic_id}.{extension}")
+
+    def unit_propagation_count(self):
+        # Engines without a propagator count their forced moves themselves
+        if self.propagator is not None:
+            return self.propagator.n_unit_propagations - self.propagation_offset
+        return self.n_unit_propagations
+
+    def stats_record(self):
+        """
+        Everything measured about this solve, with the time per search
+        phase if it was instrumented and what the CNF preprocessing removed
+        if the formula was simplified on its own.
+        """
+        record = {
+            "id": self.id,
+            "filename": self.filename,
+            "strategy": self.heuristic_id,
+            "status": self.status(),
+            "runtime": round(self.runtime, 6),
+            "backtracks": self.n_backtracks,
+            "splits": self.n_splits,
+            "conflicts": self.n_conflicts,
+            "unit_propagations": self.unit_propagation_count(),
+            "learned": self.n_learned,
+            "restarts": self.n_restarts,
+            "max_stack_depth": self.max_stack_depth,
+            "cached": self.cached
+        }
+        if self.preprocessing is not None:
+            record["preprocessing"] = self.preprocessing
+        if self.phases is not None:
+            record["phases"] = self.phases
+        elif self.instrumentation is not None:
+            # Still solving, or saved from within the solve
+            record["phases"] = self.instrumentation.record()
+        return record
+
+    def stats_entry(self):
+        if self.stats_format == "json":
+            return json.dumps(self.stats_record()) + "\n"
+        return self.performence_stats_line()
+
+    def performence_stats_line(self, backtrack_count=None, split_count=None, conflict_count=None, unit_clauses_resolved=None):
+        backtrack_count = backtrack_count if backtrack_count is not None else self.n_backtracks
+        split_count = split_count if split_count is not None else self.n_splits
+        conflict_count = conflict_count if conflict_count is not None else self.n_conflicts
+        unit_clauses_resolved = unit_clauses_resolved if unit_clauses_resolved is not None else self.unit_propagation_count()
         runtime = self.runtime
 
-        stats_line = f"{self.id} {runtime:.2f} {backtrack_count} {split_count} {conflict_count} {unit_clauses_resolved}\n"
+        stats_line = f"{self.id} {runtime:.2f} {backtrack_count} {split_count} {conflict_count} {unit_clauses_resolved} {self.status()}"
+        if self.restart_policy is not None:
+            stats_line += f" {self.n_restarts}"
+        return stats_line + "\n"
+
+    def save_performence_stats(self, backtrack_count=None, split_count=None, conflict_count=None, unit_clauses_resolved=None):
+        # Stats are collected by the caller instead, e.g. in worker processes
+        if not self.persist:
+            return
+
+        if not os.path.exists("results"):
+            os.makedirs("results")
+
+        if self.stats_format == "json":
+            stats_line = self.stats_entry()
+        else:
+            stats_line = self.performence_stats_line(backtrack_count, split_count, conflict_count, unit_clauses_resolved)
 
-        with open(stats_file_name, "a") as stats_file:
+        with open(self.stats_file_name(), "a") as stats_file:
             stats_file.write(stats_line)
         # filename_basic.txt
         # 0 12.0 13 0 
@@ -356,65 +526,94 @@ class Sudoku:
 
     def print_solved_sudoku(self):
         print(f"Solved Sudoku:\n")
-        variables = {literal if value else -literal for literal, value in self.assignments.items() if value}
-        # Initialize a 9x9 grid with empty values (.)
-        grid = [['.' for _ in range(9)] for _ in range(9)]
+        grid_size = self.grid_size
+        box_size = int(grid_size ** 0.5)
+        # Initialize the grid with empty values (.)
+        grid = [['.' for _ in range(grid_size)] for _ in range(grid_size)]
         
-        # Loop through each variable in the list and place the value in the correct grid position
-        for var in variables:
-            row = (var // 100) - 1  # Get the row (subtract 1 to match 0-indexing)
-            col = (var % 100) // 10 - 1  # Get the column (subtract 1 to match 0-indexing)
-            value = var % 10  # Get the value (last digit)
-            
-            # Ensure row and col are within bounds
-            if 0 <= row < 9 and 0 <= col < 9:
+        # Place the value of every true variable in its grid position
+        for variable in range(1, self.n_vars + 1):
+            if self.assignments[variable] > 0:
+                row, col, value = self.encoding.decode(variable)
                 grid[row][col] = str(value)
-            else:
-                print(f"Error: Invalid variable {var}, out of bounds.")
 
-        # Print the Sudoku grid with lines separating 3x3 subgrids
-        for r in range(9):
-            if r % 3 == 0 and r != 0:
-                print("-" * 21)  # Print a separator line after every 3 rows
+        # Print the Sudoku grid with lines separating the boxes
+        for r in range(grid_size):
+            if r % box_size == 0 and r != 0:
+                print("-" * (2 * grid_size + 3 * (box_size - 1)))  # Print a separator line after every band
             row_display = ""
-            for c in range(9):
-                if c % 3 == 0 and c != 0:
-                    row_display += " | "  # Add a vertical separator after every 3 columns
+            for c in range(grid_size):
+                if c % box_size == 0 and c != 0:
+                    row_display += " | "  # Add a vertical separator after every box
                 row_display += grid[r][c] + " "
             print(row_display)
 
 
     def solution_to_dimac(self) -> list:
-        all_variables = set()
-        for row in range(1, self.grid_size + 1):
-            for col in range(1, self.grid_size + 1):
-                for val in range(1, self.grid_size + 1):
-                    variable = int(f"{row}{col}{val}")
-                    all_variables.add(variable)
-        
-        true_literals = {literal if value else -literal for literal, value in self.assignments.items() if value}
-        assert len(self.assignments) == len(all_variables), "Not all variables assigned!"
+        """
+        Return the solution as unit literals, named like the rules files.
+        """
+        if self.encoding is None:
+            # A plain CNF, its variables keep their own names
+            return self.model()
+
+        assert all(self.assignments[variable] for variable in range(1, self.n_vars + 1)), "Not all variables assigned!"
 
-        false_literals = {-literal for literal in all_variables if literal not in true_literals}
+        true_literals = [self.encoding.external(variable) for variable in range(1, self.n_vars + 1) if self.assignments[variable] > 0]
+        false_literals = [-self.encoding.external(variable) for variable in range(1, self.n_vars + 1) if self.assignments[variable] < 0]
 
-        dimac_clauses = list(true_literals) + list(false_literals)
+        dimac_clauses = true_literals + false_literals
         return dimac_clauses
     
 
-    def output_solution(self):
+    def model(self):
+        """
+        The assignment as one literal per variable. Variables still
+        unassigned, which no clause left after simplification needed,
+        are taken false.
+        """
+        return [variable if self.assignments[variable] > 0 else -variable for variable in range(1, self.n_vars + 1)]
+
+    def solution_values(self):
+        """
+        Value of every cell in row-major order, 0 where none is true.
+        """
+        values = [0] * (self.grid_size * self.grid_size)
+        for variable in range(1, self.n_vars + 1):
+            if self.assignments[variable] > 0:
+                row, col, value = self.encoding.decode(variable)
+                values[row * self.grid_size + col] = value
+        return values
+
+    def assign_solution(self, values):
+        self.assignments = array('b', [-1]) * (self.n_vars + 1)
+        self.assignments[0] = 0
+        for cell, value in enumerate(values):
+            row, col = divmod(cell, self.grid_size)
+            self.assignments[self.encoding.variable(row, col, value)] = 1
+
+
+    def solution_file_name(self):
+        return f"output/{self.filename}.out"
+
+    def solution_dimacs(self):
         dimac_clauses = self.solution_to_dimac()
         n_vars = self.n_vars                
         n_clauses = len(dimac_clauses)            
 
+        lines = [f"p cnf {n_vars} {n_clauses}\n"]
+        lines.extend(f"{clause} 0\n" for clause in dimac_clauses)
+        return "".join(lines)
+
+    def output_solution(self):
+        if not self.persist:
+            return
+
         if not os.path.exists("output"):
             os.makedirs("output")
-        output_file = f"output/{self.filename}.out"
 
-        with open(output_file, 'w') as file:
-            file.write(f"p cnf {n_vars} {n_clauses}\n")
-            
-            for clause in dimac_clauses:
-                file.write(f"{clause} 0\n")
+        with open(self.solution_file_name(), 'w') as file:
+            file.write(self.solution_dimacs())
 
 
 
@@ -422,4 +621,4 @@ class Sudoku:
         return (f"Sudoku CNF with {self.n_vars} variables, "
                 f"{self.n_clauses} clauses, and comments:\n" +
                 "\n".join(self.comment) + "\nClauses:\n" + "\n".join(map(str, self.clauses)) +
-                "Constraints:\n" + "\n".join(map(str, self.assignments)))
\ No newline at end of file
+                "Constraints:\n" + "\n".join(str(variable * value) for variable, value in enumerate(self.assignments) if value))
\ No newline at end of file
@@ -0,0 +1,92 @@
+class VariableOrder:
+    """
+    Binary max-heap of variables keyed on their VSIDS activity.
+
+    The activities live in the dictionary passed in (the Sudoku's
+    variable_scores), the heap only keeps the order. Picking the most active
+    variable and raising the activity of one variable are both O(log n).
+    """
+    def __init__(self, activity, variables=None) -> None:
+        self.activity = activity
+        self.heap = []
+        self.indices = {}
+
+        if variables is not None:
+            for variable in variables:
+                self.activity.setdefault(variable, 0)
+            # A list sorted by descending activity already satisfies the heap property
+            self.heap = sorted(set(variables), key=lambda variable: -self.activity[variable])
+            self.indices = {variable: index for index, variable in enumerate(self.heap)}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, variable):
+        return variable in self.indices
+
+
+    def insert(self, variable):
+        if variable in self.indices:
+            return
+        self.activity.setdefault(variable, 0)
+        self.heap.append(variable)
+        self.indices[variable] = len(self.heap) - 1
+        self.sift_up(len(self.heap) - 1)
+
+    def pop(self):
+        """
+        Remove and return the variable with the highest activity.
+        """
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.indices[top]
+        if heap:
+            heap[0] = last
+            self.indices[last] = 0
+            self.sift_down(0)
+        return top
+
+    def increase(self, variable):
+        """
+        Restore the heap order after the activity of a variable went up.
+        """
+        index = self.indices.get(variable)
+        if index is not None:
+            self.sift_up(index)
+
+
+    def sift_up(self, index):
+        heap = self.heap
+        activity = self.activity
+        variable = heap[index]
+        score = activity[variable]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if activity[heap[parent]] >= score:
+                break
+            heap[index] = heap[parent]
+            self.indices[heap[index]] = index
+            index = parent
+        heap[index] = variable
+        self.indices[variable] = index
+
+    def sift_down(self, index):
+        heap = self.heap
+        activity = self.activity
+        size = len(heap)
+        variable = heap[index]
+        score = activity[variable]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            if activity[heap[child]] <= score:
+                break
+            heap[index] = heap[child]
+            self.indices[heap[index]] = index
+            index = child
+        heap[index] = variable
+        self.indices[variable] = index
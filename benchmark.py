@@ -0,0 +1,262 @@
+import os
+import io
+import sys
+import json
+import random
+import time
+import platform
+import argparse
+import resource
+import contextlib
+import multiprocessing
+from Encoding import Encoding
+from Solvers import make_solvers, EXACT_COVER
+from CnfSolver import CnfSolver
+from GridPreprocessor import GridPreprocessor
+from Budget import Budget
+from ClauseEvaluator import BACKENDS, np
+from PuzzleReader import read_puzzles, peek_grid_size
+from Dimacs import read_dimacs, random_ksat
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DATASETS = {
+    "4x4": "4x4.txt",
+    "1000sudokus": "1000sudokus.txt",
+    "top91": "top91.sdk.txt",
+    "top2365": "top2365.sdk.txt",
+    "damnhard": "damnhard.sdk.txt",
+    "16x16": "16x16.txt"
+}
+# 3sat-<n>: uniform random 3-SAT over n variables, generated locally
+RANDOM_3SAT = "3sat-"
+# Clauses per variable, at the phase transition where instances are hardest
+RANDOM_3SAT_RATIO = 4.26
+RANDOM_3SAT_INSTANCES = 100
+# Run when no datasets are given: a few minutes, unlike damnhard and 16x16
+DEFAULT_DATASETS = ("4x4", "1000sudokus", "top91", "3sat-50")
+ENGINES = {1: "basic", 2: "mom", 3: "vsids", 4: "cdcl", 5: "dlx"}
+PERCENTILES = (50, 95, 99)
+
+
+def dataset_path(dataset):
+    """
+    Path of a bundled dataset by name, or the argument itself for any other
+    puzzle file.
+    """
+    if dataset in DATASETS:
+        return os.path.join(DATA_DIR, DATASETS[dataset])
+    return dataset
+
+
+def load_puzzles(path, limit=None):
+    grid_size, puzzles = peek_grid_size(read_puzzles(path))
+    encoding = Encoding(grid_size)
+    loaded = []
+    for sudoku_id, puzzle in puzzles:
+        if limit is not None and sudoku_id >= limit:
+            break
+        loaded.append((sudoku_id, puzzle))
+    return grid_size, encoding, loaded
+
+
+def is_cnf_dataset(dataset):
+    return dataset.startswith(RANDOM_3SAT) or dataset.removesuffix(".gz").endswith(".cnf")
+
+
+def load_formulas(dataset, limit=None, seed=0):
+    """
+    Formulas of a CNF dataset as (id, n_vars, clauses): the instances of
+    3sat-<n>, generated from the seed so every run and every engine gets
+    the same ones, or the single formula of a DIMACS file.
+    """
+    if dataset.startswith(RANDOM_3SAT):
+        n_vars = int(dataset[len(RANDOM_3SAT):])
+        n_clauses = round(RANDOM_3SAT_RATIO * n_vars)
+        rng = random.Random(f"{seed}:{dataset}")
+        count = limit if limit is not None else RANDOM_3SAT_INSTANCES
+        return [(index, n_vars, random_ksat(n_vars, n_clauses, 3, rng)) for index in range(count)]
+    n_vars, clauses = read_dimacs(dataset)
+    return [(0, n_vars, clauses)]
+
+
+def percentile(sorted_values, q):
+    """
+    q-th percentile of sorted values, interpolating between the closest ranks.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def load_jobs(dataset, strategy, limit=None, preprocess=False, budget=None, instrument=False, seed=0, backend=None):
+    """
+    Build the solver for a dataset and the arguments of each of its solves.
+    Puzzles are solved as givens against the rules of their grid size,
+    CNF datasets formula by formula with the same engines.
+    """
+    options = {"backend": backend, "budget": budget, "instrument": instrument}
+    if is_cnf_dataset(dataset):
+        solver = CnfSolver(dataset, heuristic_id=strategy, persist=False, **options)
+        jobs = [(clauses, n_vars, formula_id) for formula_id, n_vars, clauses in load_formulas(dataset, limit, seed)]
+        return dataset, None, solver, jobs
+
+    path = dataset_path(dataset)
+    grid_size, encoding, puzzles = load_puzzles(path, limit)
+    solver = make_solvers(None, grid_size, dataset, (strategy,), options)[strategy]
+    preprocessor = GridPreprocessor(grid_size, encoding) if preprocess else None
+
+    jobs = []
+    for sudoku_id, puzzle in puzzles:
+        constraints = preprocessor.preprocess(puzzle) if preprocessor is not None else encoding.givens(puzzle)
+        jobs.append((constraints, sudoku_id))
+    return path, grid_size, solver, jobs
+
+
+def run_configuration(dataset, strategy, repeat=1, warmup=0, limit=None, preprocess=False, time_limit=None, instrument=False, seed=0, backend=None):
+    """
+    Benchmark one engine on one dataset: the puzzles are loaded and the
+    solver is built first, then solved warmup times unmeasured and repeat
+    times measured. Solver output is discarded. Instrumented runs also
+    report the calls and time per search phase, summed over the solves.
+    """
+    budget = Budget(time_limit) if time_limit is not None else None
+    path, grid_size, solver, jobs = load_jobs(dataset, strategy, limit, preprocess, budget, instrument, seed, backend)
+
+    latencies = []
+    run_times = []
+    statuses = {"SAT": 0, "UNSAT": 0, "UNKNOWN": 0}
+    counts = {"splits": 0, "backtracks": 0, "conflicts": 0}
+    phases = {}
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        for run in range(warmup + repeat):
+            measured = run >= warmup
+            run_start = time.perf_counter()
+            for job in jobs:
+                start = time.perf_counter()
+                sudoku = solver.solve(*job)
+                elapsed = time.perf_counter() - start
+                if measured:
+                    latencies.append(elapsed)
+                    statuses[sudoku.status()] += 1
+                    counts["splits"] += sudoku.n_splits
+                    counts["backtracks"] += sudoku.n_backtracks
+                    counts["conflicts"] += sudoku.n_conflicts
+                    for phase, measured_phase in (sudoku.phases or {}).items():
+                        total = phases.setdefault(phase, {"calls": 0, "seconds": 0.0})
+                        total["calls"] += measured_phase["calls"]
+                        total["seconds"] += measured_phase["seconds"]
+                output.seek(0)
+                output.truncate()
+            if measured:
+                run_times.append(time.perf_counter() - run_start)
+
+    latencies.sort()
+    n_solves = len(latencies)
+    total_time = sum(run_times)
+    result = {
+        "dataset": dataset,
+        "path": path,
+        "strategy": strategy,
+        "engine": ENGINES[strategy],
+        "grid_size": grid_size,
+        "puzzles": len(jobs),
+        "warmup": warmup,
+        "repeat": repeat,
+        "status": statuses,
+        "run_times": [round(run_time, 6) for run_time in run_times],
+        "throughput": n_solves / total_time if total_time else 0.0,
+        "latency": {
+            "mean": sum(latencies) / n_solves if n_solves else 0.0,
+            "max": latencies[-1] if latencies else 0.0
+        },
+        "mean_counts": {name: count / n_solves if n_solves else 0.0 for name, count in counts.items()},
+        "peak_rss_kb": peak_rss_kb()
+    }
+    if phases:
+        result["phases"] = phases
+    for q in PERCENTILES:
+        result["latency"][f"p{q}"] = percentile(latencies, q)
+    return result
+
+
+def run_isolated(*args):
+    """
+    Run a configuration in a fresh process, so its peak RSS is its own and
+    nothing is warmed up by the configurations before it.
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_configuration, args)
+
+
+def compare(baseline, results):
+    """
+    Print the change in median latency and throughput against a previous
+    report for the configurations both contain.
+    """
+    previous = {(result["dataset"], result["strategy"]): result for result in baseline["results"]}
+    for result in results:
+        before = previous.get((result["dataset"], result["strategy"]))
+        if before is None:
+            continue
+        p50_change = result["latency"]["p50"] / before["latency"]["p50"] - 1 if before["latency"]["p50"] else 0.0
+        throughput_change = result["throughput"] / before["throughput"] - 1 if before["throughput"] else 0.0
+        print(f"{result['dataset']:>12} {result['engine']:>6}: p50 {p50_change:+.1%}, throughput {throughput_change:+.1%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the solving engines over the bundled datasets and report JSON")
+    parser.add_argument("--datasets", nargs="+", default=list(DEFAULT_DATASETS),
+                        help=f"Dataset names ({', '.join(DATASETS)}), puzzle files, DIMACS .cnf files, or 3sat-<n> for uniform random 3-SAT over n variables")
+    parser.add_argument("--strategies", type=int, nargs="+", choices=sorted(ENGINES), default=[1, 2, 3], help="1 basic, 2 MOM, 3 VSIDS, 4 CDCL, 5 exact cover (DLX)")
+    parser.add_argument("--repeat", type=int, default=1, help="Measured runs over each dataset")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured runs over each dataset before the measured ones")
+    parser.add_argument("--limit", type=int, default=None, help=f"Only use the first puzzles of each dataset; instances generated per 3sat-<n>, {RANDOM_3SAT_INSTANCES} by default")
+    parser.add_argument("--seed", type=int, default=0, help="Seed the random 3-SAT instances are generated from")
+    parser.add_argument("--preprocess", action="store_true", help="Preprocess the puzzles on the grid before the search")
+    parser.add_argument("--time_limit", type=float, default=None, help="Seconds per puzzle before it is counted UNKNOWN")
+    parser.add_argument("--instrument", action="store_true", help="Also report calls and time per search phase; adds the timing overhead")
+    parser.add_argument("--backend", choices=BACKENDS, default="python", help="How whole-formula satisfaction checks are evaluated")
+    parser.add_argument("--output", type=str, default=None, help="Write the report here instead of to stdout")
+    parser.add_argument("--compare", type=str, default=None, help="Previous report to compare against")
+    args = parser.parse_args()
+    if args.backend == "numpy" and np is None:
+        parser.error("--backend numpy needs NumPy installed")
+
+    results = []
+    for dataset in args.datasets:
+        for strategy in args.strategies:
+            if strategy == EXACT_COVER and is_cnf_dataset(dataset):
+                # Exact cover only solves Sudokus
+                continue
+            print(f"{dataset} {ENGINES[strategy]}...", file=sys.stderr)
+            result = run_isolated(dataset, strategy, args.repeat, args.warmup, args.limit, args.preprocess, args.time_limit, args.instrument, args.seed, args.backend)
+            print(f"  {result['throughput']:.1f} puzzles/s, p50 {result['latency']['p50'] * 1000:.1f} ms, "
+                  f"p99 {result['latency']['p99'] * 1000:.1f} ms, {result['peak_rss_kb']} KB", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": vars(args),
+        "results": results
+    }
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            compare(json.load(baseline_file), results)
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
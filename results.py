@@ -1,28 +1,60 @@
+import json
 import numpy as np
 
+STATUSES = ("SAT", "UNSAT", "UNKNOWN")
+
+def load_results(file_path):
+    """
+    Read a stats file, positional lines or JSON records, and group its rows
+    by status. Rows written before the status column existed count as
+    solved.
+    """
+    rows = {status: [] for status in STATUSES}
+    with open(file_path) as stats_file:
+        for line in stats_file:
+            if line.startswith("{"):
+                record = json.loads(line)
+                rows[record["status"]].append([record["id"], record["runtime"], record["backtracks"], record["splits"], record["conflicts"], record["unit_propagations"]])
+                continue
+            fields = line.split()
+            if not fields:
+                continue
+            status = fields[6] if len(fields) > 6 and fields[6] in STATUSES else "SAT"
+            rows[status].append([float(field) for field in fields[:6]])
+    return {status: np.array(status_rows).reshape(-1, 6) for status, status_rows in rows.items()}
+
 def calculate_statistics(file_paths):
     for file_path in file_paths:
-        data = np.loadtxt(file_path)
-        
-        # Calculate mean and standard deviation for each column
+        results = load_results(file_path)
+        data = results["SAT"]
+        timed_out = results["UNKNOWN"]
+
+        # Print the results for this heuristic
+        heuristic_name = file_path.split('/')[-1].replace('.txt', '')
+        print(f"Statistics for {heuristic_name}:")
+        print(f"  Solved: {len(data)}, Timed out: {len(timed_out)}")
+        if len(timed_out):
+            print(f"  Timed out: {' '.join(str(int(sudoku_id)) for sudoku_id in timed_out[:, 0])}")
+        if not len(data):
+            print('-' * 50)
+            continue
+
+        # Calculate mean and standard deviation for each column, over the solved puzzles only
         runtime_mean = np.mean(data[:, 1])
         runtime_std = np.std(data[:, 1])
-        
+
         backtracks_mean = np.mean(data[:, 2])
         backtracks_std = np.std(data[:, 2])
-        
+
         splits_mean = np.mean(data[:, 3])
         splits_std = np.std(data[:, 3])
-        
+
         conflicts_mean = np.mean(data[:, 4])
         conflicts_std = np.std(data[:, 4])
-        
+
         unit_clauses_resolved_mean = np.mean(data[:, 5])
         unit_clauses_resolved_std = np.std(data[:, 5])
-        
-        # Print the results for this heuristic
-        heuristic_name = file_path.split('/')[-1].replace('.txt', '')
-        print(f"Statistics for {heuristic_name}:")
+
         print(f"  Runtime: Mean = {runtime_mean:.2f}, Std = {runtime_std:.2f}")
         print(f"  Backtracks: Mean = {backtracks_mean:.2f}, Std = {backtracks_std:.2f}")
         print(f"  Splits: Mean = {splits_mean:.2f}, Std = {splits_std:.2f}")
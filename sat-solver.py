@@ -1,65 +1,55 @@
 import os
+import sys
 import argparse
-import math
+import multiprocessing
+import multiprocessing.connection
 import random
+import threading
 import time
-from Sudoku import Sudoku
+import json
+import contextlib
+from Sudoku import Sudoku, STATS_FORMATS
+from Encoding import Encoding
+from Solvers import load_database, make_solvers, EXACT_COVER
+from RestartPolicy import RestartPolicy, SCHEDULES
+from Budget import Budget
+from ClauseEvaluator import BACKENDS, np
+from GridPreprocessor import GridPreprocessor
+from ResultsSink import ResultsSink, LAYOUTS
+from SolutionCache import SolutionCache, UNSATISFIABLE
+from SolverService import SolverService
+from CnfSolver import CnfSolver, satisfies
+from Dimacs import read_dimacs
+from PuzzleReader import read_puzzles, peek_grid_size, grid_size_of, puzzle_name
 
 
 def get_grid_size(puzzle_path):
-    with open(puzzle_path, 'r') as f:
-        first_line = f.readline().strip()
-    grid_size = int(math.sqrt(len(first_line)))
+    _, puzzle = next(read_puzzles(puzzle_path))
+    return grid_size_of(puzzle)
 
-    assert(grid_size == 4 or grid_size == 9 or grid_size == 16), "Invalid grid size"
 
-    return grid_size
-
-
-def encode_rules_in_dimac(rules_path: str):
-    rules = []
-
-    with open(rules_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-
-            if not line.startswith('c') and not line.startswith('p'):
-                clause = list(map(int, line.split()[:-1]))
-                rules.append(clause)
-
-    return rules
+def load_rules(rules_file, grid_size):
+    return [list(clause) for clause in load_database(rules_file, grid_size).clauses]
 
 
 def encode_puzzle_in_dimacs(puzzle, grid_size: int = 4):
-    constraints = []
-    
-    def encode_var(row, col, value):
-        return 100 * (row + 1) + 10 * (col + 1) + value
-    
-    for r in range(grid_size):
-        for c in range(grid_size):
-            char = puzzle[r * grid_size + c]
-            if char.isdigit():
-                value = int(char)
-                constraints.append([encode_var(r, c, value)])
-            # TO-DO: Support for 16x16
-
-
-    return constraints
+    return Encoding(grid_size).givens(puzzle)
 
 
-def encode_rules_and_constraints(rules_file, puzzle_file, grid_size):
-    rules = encode_rules_in_dimac(rules_file)
-    with open(puzzle_file, 'r') as f:
-        puzzle = f.readline().strip()
-    constraints = encode_puzzle_in_dimacs(puzzle, grid_size)
+def encode_rules_and_constraints(rules_file, puzzle_file, grid_size, preprocess=False):
+    rules = load_rules(rules_file, grid_size)
+    _, puzzle = next(read_puzzles(puzzle_file))
+    if preprocess:
+        constraints = GridPreprocessor(grid_size).preprocess(puzzle)
+    else:
+        constraints = encode_puzzle_in_dimacs(puzzle, grid_size)
     sudoku = Sudoku(
         rules=rules,
         constraints=constraints,
         clauses=rules+constraints,
         grid_size=grid_size,
         n_vars=grid_size*grid_size*grid_size,
-        filename=os.path.splitext(os.path.basename(puzzle_file))[0]
+        filename=puzzle_name(puzzle_file)
     )
 
     sudoku.init_simplification()
@@ -71,90 +61,492 @@ def encode_rules_and_constraints(rules_file, puzzle_file, grid_size):
     return sudoku
 
 
+HEURISTIC_NAMES = {1: "Basic Heuristic", 2: "MOM", 3: "VSIDS", 4: "CDCL", 5: "DLX"}
+
+
 def select_heuristic(strategy, sudoku: Sudoku):
-    if strategy == 1:
-        sudoku.basic_dpll()
-    elif strategy == 2:
-        sudoku.mom_dpll()
-    elif strategy == 3:
-        sudoku.vsids_dpll()
-
-
-def test_sudokus(rules_file, puzzle_file, grid_size):
-    rules = encode_rules_in_dimac(rules_file)
-    sudoku_id = 0
-
-    with open(puzzle_file, 'r') as f:
-        for sudoku in f:
-            puzzle = sudoku.strip()
-            constraints = encode_puzzle_in_dimacs(puzzle, grid_size)
+    sudoku.solve(strategy)
+
+
+def cached_results(solvers, sudoku_id, solution, runtime):
+    """
+    Result tuples for a puzzle answered from the solution cache, as if
+    every strategy had found the solution without any search. The solution
+    is written once, with the first strategy.
+    """
+    results = []
+    for strategy, solver in solvers.items():
+        if solution == UNSATISFIABLE:
+            results.append((strategy, "UNSAT", None, None, None, None))
+            break
+        sudoku = Sudoku(
+            id=sudoku_id,
+            grid_size=solver.grid_size,
+            n_vars=solver.encoding.n_vars,
+            filename=solver.filename,
+            heuristic_id=strategy,
+            encoding=solver.encoding
+        )
+        sudoku.stats_format = solver.stats_format
+        sudoku.cached = True
+        sudoku.runtime = runtime
+        sudoku.assign_solution(solution)
+        dimacs = sudoku.solution_dimacs() if not results else None
+        results.append((strategy, "SAT", sudoku.stats_file_name(), sudoku.stats_entry(), sudoku.solution_file_name(), dimacs))
+    return results
+
+
+def lookup_cache(cache, puzzle):
+    """
+    Look a puzzle up in the solution cache. Returns the cached solution and
+    the time the lookup took, or None on a miss.
+    """
+    start_time = time.time()
+    solution = cache.get(puzzle)
+    if solution is None:
+        return None
+    return solution, time.time() - start_time
+
+
+def search_puzzle(solvers, sudoku_id, puzzle, preprocessor=None):
+    """
+    Solve one puzzle with every strategy. Returns a result tuple per
+    strategy, stopping at the first that finds it unsatisfiable, and the
+    answer for the cache: the solution values, UNSATISFIABLE, or None if
+    every strategy ran out of budget. A strategy that runs out of budget
+    reports UNKNOWN and the next one is tried. Only the first solution
+    found is kept for output/<name>.out. With a preprocessor the
+    givens are replaced by everything it decided on the grid, so the
+    search only sees the unsolved cells.
+    """
+    results = []
+    answer = None
+    if preprocessor is not None:
+        constraints = preprocessor.preprocess(puzzle)
+    else:
+        constraints = encode_puzzle_in_dimacs(puzzle, next(iter(solvers.values())).grid_size)
+    for strategy, solver in solvers.items():
+        print(f"{HEURISTIC_NAMES[strategy]}\n")
+        sudoku = solver.solve(constraints, sudoku_id)
+        status = sudoku.status()
+        if status == "UNSAT":
+            results.append((strategy, status, None, None, None, None))
+            answer = UNSATISFIABLE
+            break
+        solution = None
+        if status == "SAT" and answer is None:
+            answer = sudoku.solution_values()
+            solution = sudoku.solution_dimacs()
+        results.append((strategy, status, sudoku.stats_file_name(), sudoku.stats_entry(), sudoku.solution_file_name(), solution))
+    return results, answer
+
+
+def solve_puzzle(solvers, sudoku_id, puzzle, preprocessor=None, cache=None):
+    """
+    Solve one puzzle with every strategy, see search_puzzle. With a cache,
+    puzzles equivalent to one solved before are answered without a
+    search, and new answers are added to it.
+    """
+    if cache is not None:
+        hit = lookup_cache(cache, puzzle)
+        if hit is not None:
+            return cached_results(solvers, sudoku_id, *hit)
+
+    results, answer = search_puzzle(solvers, sudoku_id, puzzle, preprocessor)
+    if cache is not None and answer is not None:
+        cache.put(puzzle, answer)
+    return results
+
+
+def solve_puzzles(solvers, puzzles, preprocessor=None, cache=None):
+    for sudoku_id, puzzle in puzzles:
+        print(f"Testing Sudoku: {sudoku_id}\n")
+        yield sudoku_id, solve_puzzle(solvers, sudoku_id, puzzle, preprocessor, cache)
+
+
+def write_results(results, solution_layout=None):
+    """
+    Last stage of the pipeline: collect the stats lines and solutions of
+    each (sudoku_id, results) pair pulled from the previous stage in a
+    ResultsSink, which writes them in bulk. Stops at the first
+    unsatisfiable puzzle; puzzles left UNKNOWN only get their stats line.
+    """
+    with ResultsSink(solution_layout) as sink:
+        for sudoku_id, puzzle_results in results:
+            for strategy, status, stats_file_name, stats_line, solution_file_name, solution in puzzle_results:
+                if status == "UNSAT":
+                    print(f"Sudoku not satisfiable!\n")
+                    return
+                if status == "UNKNOWN":
+                    print(f"Sudoku not solved within the budget\n")
+
+                sink.add_stats(stats_file_name, stats_line)
+                if solution is not None:
+                    sink.add_solution(solution_file_name, sudoku_id, solution)
+
+
+def open_puzzles(puzzle_file, grid_size=None):
+    puzzles = read_puzzles(puzzle_file)
+    if grid_size is None:
+        grid_size, puzzles = peek_grid_size(puzzles)
+    return grid_size, puzzles
+
+
+def open_cache(grid_size, cache_options):
+    if cache_options is None:
+        return None
+    return SolutionCache(grid_size, **cache_options)
+
+
+def close_cache(cache):
+    if cache is not None:
+        print(cache.report())
+        cache.close()
+
+
+def test_sudokus(rules_file, puzzle_file, grid_size=None, strategies=(1, 2, 3), preprocess=False, options=None, solution_layout=None, cache_options=None):
+    """
+    Solve a puzzle collection as a pipeline of generators:
+    read -> encode -> solve -> write. Each stage pulls one puzzle at a time
+    from the previous one, so memory stays constant however long the file.
+    """
+    grid_size, puzzles = open_puzzles(puzzle_file, grid_size)
+    filename = puzzle_name(puzzle_file)
+    solvers = make_solvers(rules_file, grid_size, filename, strategies, options)
+
+    preprocessor = GridPreprocessor(grid_size) if preprocess else None
+    cache = open_cache(grid_size, cache_options)
+
+    try:
+        write_results(solve_puzzles(solvers, puzzles, preprocessor, cache), solution_layout)
+    finally:
+        close_cache(cache)
+
+
+worker_solvers = {}
+worker_preprocessor = None
+
+
+def init_worker(rules_file, grid_size, filename, strategies, preprocess=False, options=None):
+    """
+    Load the rules once per worker process. Workers stay silent, their
+    results are reported by the parent.
+    """
+    global worker_preprocessor
+    sys.stdout = open(os.devnull, 'w')
+    worker_solvers.update(make_solvers(rules_file, grid_size, filename, strategies, options))
+    worker_preprocessor = GridPreprocessor(grid_size) if preprocess else None
+
+
+def solve_in_worker(job):
+    """
+    Solve a puzzle, or turn the cache hit the parent found for it into
+    results. Returns the answer found for the parent to cache.
+    """
+    sudoku_id, puzzle, hit = job
+    if hit is not None:
+        return sudoku_id, puzzle, cached_results(worker_solvers, sudoku_id, *hit), None
+    results, answer = search_puzzle(worker_solvers, sudoku_id, puzzle, worker_preprocessor)
+    return sudoku_id, puzzle, results, answer
+
+
+def throttle(jobs, window, stopped):
+    """
+    Hold back the jobs fed to the pool until their results are consumed.
+    Pool.imap reads its input eagerly, so without this a large file would
+    be queued into memory as fast as it can be read.
+    """
+    for job in jobs:
+        window.acquire()
+        if stopped.is_set():
+            return
+        yield job
+
+
+def test_sudokus_parallel(rules_file, puzzle_file, grid_size=None, strategies=(1, 2, 3), workers=2, chunksize=16, preprocess=False, options=None, solution_layout=None, cache_options=None):
+    """
+    Spread the puzzles of a file over a process pool. Results come back in
+    input order and only this process writes the stats and solution files,
+    so lines never interleave. At most a few chunks per worker are in
+    flight at any time. The solution cache is kept here as well: puzzles
+    are looked up before they are sent to a worker and the answers the
+    workers find are added to it.
+    """
+    grid_size, puzzles = open_puzzles(puzzle_file, grid_size)
+    filename = puzzle_name(puzzle_file)
+    window = threading.Semaphore(workers * chunksize * 4)
+    stopped = threading.Event()
+    cache = open_cache(grid_size, cache_options)
+    # The pool feeds jobs from its own thread, so lookups and puts may overlap
+    cache_lock = threading.Lock()
+
+    def lookup(jobs):
+        for sudoku_id, puzzle in jobs:
+            hit = None
+            if cache is not None:
+                with cache_lock:
+                    hit = lookup_cache(cache, puzzle)
+            yield sudoku_id, puzzle, hit
+
+    def collect(results):
+        for sudoku_id, puzzle, puzzle_results, answer in results:
+            window.release()
+            if cache is not None and answer is not None:
+                with cache_lock:
+                    cache.put(puzzle, answer)
+            print(f"Testing Sudoku: {sudoku_id}\n")
+            for strategy, *_ in puzzle_results:
+                print(f"{HEURISTIC_NAMES[strategy]}\n")
+            yield sudoku_id, puzzle_results
+
+    try:
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=(rules_file, grid_size, filename, strategies, preprocess, options)) as pool:
+            try:
+                write_results(collect(pool.imap(solve_in_worker, lookup(throttle(puzzles, window, stopped)), chunksize)), solution_layout)
+            finally:
+                # Wake the feeder if it is waiting, so the pool can shut down
+                stopped.set()
+                window.release()
+    finally:
+        close_cache(cache)
+
+
+def portfolio_worker(connection, cancel, rules_file, grid_size, filename, strategy, options=None):
+    """
+    Serve one strategy of a portfolio: solve every puzzle the parent sends
+    until it sends None. A search stops early once cancel is set and is
+    then reported as cancelled; one that runs out of budget is reported
+    with status UNKNOWN.
+    """
+    sys.stdout = open(os.devnull, 'w')
+    solver = make_solvers(rules_file, grid_size, filename, (strategy,), options)[strategy]
+    solver.cancel = cancel
+
+    while True:
+        job = connection.recv()
+        if job is None:
+            break
+        sudoku_id, constraints = job
+        sudoku = solver.solve(constraints, sudoku_id)
+        if sudoku.cancelled:
+            connection.send(None)
+            continue
+        status = sudoku.status()
+        solution = sudoku.solution_dimacs() if status == "SAT" else None
+        counts = sudoku.performence_stats_line().split()[2:]
+        values = sudoku.solution_values() if status == "SAT" else None
+        connection.send((status, counts, solution, sudoku.stats_record(), values))
+
+
+def race(connections, cancel, job):
+    """
+    Send a puzzle to every strategy and return the index of the first to
+    answer, its answer and the wall time it took. The others are cancelled
+    and waited for, so all workers are idle again afterwards. If every
+    strategy runs out of budget the last UNKNOWN answer is returned.
+    """
+    start_time = time.time()
+    for connection in connections:
+        connection.send(job)
+
+    winner = answer = None
+    pending = set(range(len(connections)))
+    while winner is None and pending:
+        for connection in multiprocessing.connection.wait([connections[index] for index in pending]):
+            index = connections.index(connection)
+            pending.discard(index)
+            result = connection.recv()
+            if result is None or winner is not None:
+                continue
+            if result[0] != "UNKNOWN" or not pending:
+                winner, answer = index, result
+            else:
+                fallback = index, result
+    if winner is None:
+        winner, answer = fallback
+    runtime = time.time() - start_time
+
+    cancel.set()
+    for index in pending:
+        connections[index].recv()
+    cancel.clear()
+    return winner, answer, runtime
+
+
+def test_sudokus_portfolio(rules_file, puzzle_file, grid_size=None, strategies=(1, 2, 3), preprocess=False, options=None, solution_layout=None, cache_options=None):
+    """
+    Race the strategies on every puzzle, one process each, and keep the
+    first answer. Per puzzle the wall time, the winner's counters and the
+    winning strategy are appended to results/<name>_portfolio.txt (.jsonl
+    for JSON records), and the solution is written to output/<name>.out.
+    Puzzles answered from the cache are not raced and get winner 0.
+    """
+    grid_size, puzzles = open_puzzles(puzzle_file, grid_size)
+    filename = puzzle_name(puzzle_file)
+    options = options if options is not None else {}
+    json_stats = options.get("stats_format") == "json"
+    stats_file_name = os.path.join("results", f"{filename}_portfolio.{'jsonl' if json_stats else 'txt'}")
+    solution_file_name = f"output/{filename}.out"
+    preprocessor = GridPreprocessor(grid_size) if preprocess else None
+    cache = open_cache(grid_size, cache_options)
+
+    cancel = multiprocessing.Event()
+    connections = []
+    processes = []
+    for strategy in strategies:
+        parent_connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=portfolio_worker, args=(child_connection, cancel, rules_file, grid_size, filename, strategy, options), daemon=True)
+        process.start()
+        connections.append(parent_connection)
+        processes.append(process)
+
+    def lookup(sudoku_id, puzzle):
+        start_time = time.time()
+        values = cache.get(puzzle)
+        if values is None:
+            return None
+        if values == UNSATISFIABLE:
+            return 0, ("UNSAT", [], None, {}, values), time.time() - start_time
+        sudoku = Sudoku(id=sudoku_id, grid_size=grid_size, n_vars=grid_size ** 3, filename=filename)
+        sudoku.cached = True
+        sudoku.assign_solution(values)
+        runtime = sudoku.runtime = time.time() - start_time
+        counts = sudoku.performence_stats_line().split()[2:]
+        return 0, ("SAT", counts, sudoku.solution_dimacs(), sudoku.stats_record(), values), runtime
+
+    def solve_all():
+        for sudoku_id, puzzle in puzzles:
             print(f"Testing Sudoku: {sudoku_id}\n")
-            sudoku = Sudoku(
-                id=sudoku_id,
-                rules=rules,
-                constraints=constraints,
-                clauses=rules+constraints,
-                grid_size=grid_size,
-                n_vars=grid_size*grid_size*grid_size,
-                filename=os.path.splitext(os.path.basename(puzzle_file))[0],
-                heuristic_id=1
-            )
-            sudoku.init_simplification()
-
-            if not sudoku.satisfiable:
-                print(f"Sudoku not satisfiable!\n")
-                return
-            print("Basic Heuristic\n")
-            sudoku.basic_dpll()
-            sudoku = Sudoku(
-                id=sudoku_id,
-                rules=rules,
-                constraints=constraints,
-                clauses=rules+constraints,
-                grid_size=grid_size,
-                n_vars=grid_size*grid_size*grid_size,
-                filename=os.path.splitext(os.path.basename(puzzle_file))[0],
-                heuristic_id=2
-            )
-            sudoku.init_simplification()
-
-            if not sudoku.satisfiable:
-                print(f"Sudoku not satisfiable!\n")
-                return
-            print("MOM\n")
-            sudoku.mom_dpll()
-            sudoku = Sudoku(
-                id=sudoku_id,
-                rules=rules,
-                constraints=constraints,
-                clauses=rules+constraints,
-                grid_size=grid_size,
-                n_vars=grid_size*grid_size*grid_size,
-                filename=os.path.splitext(os.path.basename(puzzle_file))[0],
-                heuristic_id=3
-            )
-            sudoku.init_simplification()
-
-            if not sudoku.satisfiable:
-                print(f"Sudoku not satisfiable!\n")
-                return
-            print("VSIDS\n")
-            sudoku.vsids_dpll()
-            sudoku_id += 1
-
-                
+            hit = lookup(sudoku_id, puzzle) if cache is not None else None
+            if hit is not None:
+                strategy, (status, counts, solution, record, values), runtime = hit
+                print("Answered from the cache\n")
+            else:
+                if preprocessor is not None:
+                    constraints = preprocessor.preprocess(puzzle)
+                else:
+                    constraints = encode_puzzle_in_dimacs(puzzle, grid_size)
+
+                winner, (status, counts, solution, record, values), runtime = race(connections, cancel, (sudoku_id, constraints))
+                strategy = strategies[winner]
+                print(f"{HEURISTIC_NAMES[strategy]} won in {runtime:.2f}s\n")
+                if cache is not None and status != "UNKNOWN":
+                    cache.put(puzzle, values if status == "SAT" else UNSATISFIABLE)
+            if json_stats:
+                stats_line = json.dumps({**record, "wall_time": round(runtime, 6), "winner": strategy}) + "\n"
+            else:
+                stats_line = f"{sudoku_id} {runtime:.2f} {' '.join(counts)} {strategy}\n"
+            yield sudoku_id, [(strategy, status, stats_file_name, stats_line, solution_file_name, solution)]
+
+    try:
+        write_results(solve_all(), solution_layout)
+    finally:
+        for connection in connections:
+            connection.send(None)
+        for process in processes:
+            process.join()
+        close_cache(cache)
+
+
+# Answer lines of the SAT competition output format
+ANSWERS = {"SAT": "SATISFIABLE", "UNSAT": "UNSATISFIABLE", "UNKNOWN": "UNKNOWN"}
+
+
+def model_lines(model, width=10):
+    lines = [model[i:i + width] for i in range(0, len(model), width)]
+    return "".join(f"v {' '.join(map(str, line))}\n" for line in lines) + "v 0\n"
+
+
+def solve_cnf_file(cnf_file, strategy=4, options=None):
+    """
+    Solve any DIMACS CNF file with one strategy and report the answer in
+    the SAT competition format: "c" comment lines, an "s" line and the
+    model on "v" lines. The engines' own progress goes to stderr so stdout
+    stays parseable. The model is checked against the clauses as read and
+    written to output/<name>.out, the stats are appended to
+    results/<name>_heuristic_<n>.txt.
+    """
+    options = options if options is not None else {}
+    n_vars, clauses = read_dimacs(cnf_file)
+    solver = CnfSolver(puzzle_name(cnf_file), persist=False, **options)
+    print(f"c {cnf_file}: {n_vars} variables, {len(clauses)} clauses")
+    print(f"c {HEURISTIC_NAMES[strategy]}")
+
+    with contextlib.redirect_stdout(sys.stderr):
+        sudoku = solver.solve(clauses, n_vars, 0, strategy)
+    left = sudoku.preprocessing["left"]
+    print(f"c preprocessed to {left['clauses']} clauses, {left['literals']} literals")
+    status = sudoku.status()
+    print(f"s {ANSWERS[status]}")
+    with ResultsSink() as sink:
+        if status == "SAT":
+            model = sudoku.model()
+            assert satisfies(model, clauses), "Model does not satisfy the formula!"
+            print(model_lines(model), end="")
+            sink.add(sudoku.solution_file_name(), sudoku.solution_dimacs(), "w")
+        sink.add_stats(sudoku.stats_file_name(), sudoku.stats_entry())
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("--strategy", type=int, default=1, help="n=1 for basic DP, n=2 for MOM's heuristic, n=3 for VSIDS heuristic")
-    parser.add_argument("--puzzle_file", type=str)
+    parser.add_argument("--strategy", type=int, choices=sorted(HEURISTIC_NAMES), default=None, help="n=1 for basic DP, n=2 for MOM's heuristic, n=3 for VSIDS heuristic, n=4 for CDCL, n=5 for exact cover (DLX). Runs 1-3 if omitted")
+    parser.add_argument("--puzzle_file", type=str, help="One puzzle per line, optionally gzip-compressed")
+    parser.add_argument("--cnf_file", type=str, default=None, help="Solve this DIMACS CNF file, any formula, instead of puzzles. Strategies 1-4, CDCL if none given")
+    parser.add_argument("--rules_file", type=str, default=None, help="DIMACS rules to use instead of generating them for the grid size")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes to spread the puzzles over")
+    parser.add_argument("--preprocess", action="store_true", help="Fill in what singles and locked candidates determine on the grid before the search")
+    parser.add_argument("--portfolio", type=int, nargs="*", choices=sorted(HEURISTIC_NAMES), default=None, help="Race the given strategies (1-3 if none given) on every puzzle and keep the first answer")
+    parser.add_argument("--backend", choices=BACKENDS, default="python", help="How whole-formula satisfaction checks are evaluated")
+    parser.add_argument("--restarts", choices=SCHEDULES, default=None, help="Restart the DPLL and CDCL searches on a Luby or geometric schedule")
+    parser.add_argument("--restart_unit", type=int, default=100, help="Conflicts allowed in the first run between restarts")
+    parser.add_argument("--restart_factor", type=float, default=1.5, help="Growth of the run length for geometric restarts")
+    parser.add_argument("--time_limit", type=float, default=None, help="Seconds a strategy may spend on one puzzle before it is reported UNKNOWN")
+    parser.add_argument("--decision_limit", type=int, default=None, help="Decisions a strategy may make on one puzzle")
+    parser.add_argument("--conflict_limit", type=int, default=None, help="Conflicts a strategy may hit on one puzzle")
+    parser.add_argument("--stats_format", choices=STATS_FORMATS, default="lines", help="Positional stats lines in results/*.txt, or one JSON record per solve in results/*.jsonl")
+    parser.add_argument("--instrument", action="store_true", help="Count calls and time per search phase, recorded with --stats_format json")
+    parser.add_argument("--solutions", choices=LAYOUTS, default="stream", help="Write the solutions of a puzzle file to one output/<name>.out stream, or to output/<name>/<id>.out per puzzle")
+    parser.add_argument("--cache", action="store_true", help="Answer puzzles equivalent to one solved before from a solution cache")
+    parser.add_argument("--cache_size", type=int, default=4096, help="Solutions the cache keeps in memory")
+    parser.add_argument("--cache_file", type=str, default=None, help="Also keep the cached solutions in this file across runs")
+    parser.add_argument("--serve", action="store_true", help="Run as a solver service taking JSON requests, with --socket or --port")
+    parser.add_argument("--socket", type=str, default=None, help="Unix socket path of the service")
+    parser.add_argument("--port", type=int, default=8765, help="Localhost port of the service when no socket is given")
+    parser.add_argument("--grid_sizes", type=int, nargs="+", default=[4, 9, 16], help="Grid sizes the service keeps rules loaded for")
+    parser.add_argument("--max_pending", type=int, default=None, help="Requests the service admits at once, 4 per worker by default")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random choices, makes runs reproducible")
     args = parser.parse_args()
+    if args.backend == "numpy" and np is None:
+        parser.error("--backend numpy needs NumPy installed")
+
+    limits = (args.time_limit, args.decision_limit, args.conflict_limit)
+    options = {
+        "backend": args.backend,
+        "restart_policy": RestartPolicy(args.restarts, args.restart_unit, args.restart_factor) if args.restarts is not None else None,
+        "seed": args.seed,
+        "budget": Budget(*limits) if any(limit is not None for limit in limits) else None,
+        "instrument": args.instrument,
+        "stats_format": args.stats_format
+    }
+
+    cache_options = {"capacity": args.cache_size, "path": args.cache_file} if args.cache or args.cache_file is not None else None
 
-    grid_size = get_grid_size(args.puzzle_file)
-    rules_file = f"rules/sudoku-rules-{grid_size}x{grid_size}.txt"
+    rules_file = args.rules_file
 
-    test_sudokus(rules_file, args.puzzle_file, grid_size)
+    strategies = (args.strategy,) if args.strategy is not None else (1, 2, 3)
+    if args.cnf_file is not None:
+        if args.strategy == EXACT_COVER:
+            parser.error("--cnf_file needs a SAT strategy, 1-4")
+        solve_cnf_file(args.cnf_file, args.strategy if args.strategy is not None else 4, options)
+    elif args.serve:
+        service = SolverService(args.grid_sizes, (args.strategy if args.strategy is not None else 4,), workers=args.workers, max_pending=args.max_pending, options=options)
+        service.run(args.socket, port=args.port)
+    elif args.portfolio is not None:
+        test_sudokus_portfolio(rules_file, args.puzzle_file, None, tuple(args.portfolio) or (1, 2, 3), preprocess=args.preprocess, options=options, solution_layout=args.solutions, cache_options=cache_options)
+    elif args.workers > 1:
+        test_sudokus_parallel(rules_file, args.puzzle_file, None, strategies, args.workers, preprocess=args.preprocess, options=options, solution_layout=args.solutions, cache_options=cache_options)
+    else:
+        test_sudokus(rules_file, args.puzzle_file, None, strategies, preprocess=args.preprocess, options=options, solution_layout=args.solutions, cache_options=cache_options)
     #sudoku = encode_rules_and_constraints(rules_file, args.puzzle_file, grid_size)
     #select_heuristic(args.strategy, sudoku)